@@ -4,7 +4,9 @@
 import configparser
 import logging
 import time
+import queue
 import socket
+import threading
 from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException
 
 logging.basicConfig(
@@ -13,15 +15,95 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class _CircuitBreaker:
+    """
+    Stop calling the node for a while after repeated connection failures
+    
+    closed: calls go through; failures are counted
+    open: calls fail fast until the cooldown has passed
+    half_open: one probe call is let through; success closes the breaker,
+               failure reopens it with a doubled cooldown
+    """
+    
+    def __init__(self, failure_threshold=5, cooldown=5, max_cooldown=60):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0
+        self.lock = threading.Lock()
+    
+    def allow(self):
+        """Check whether a call may be made now"""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            
+            # Open, or a half-open probe that never reported back: let one
+            # probe through once the cooldown has passed
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                if self.state != 'half_open':
+                    self._transition('half_open')
+                self.opened_at = time.monotonic()
+                return True
+            return False
+    
+    def record_success(self):
+        """Record a call that reached the node"""
+        with self.lock:
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            if self.state != 'closed':
+                self._transition('closed')
+    
+    def record_failure(self):
+        """Record a call that could not reach the node"""
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open':
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open()
+            elif self.state == 'closed' and self.failures >= self.failure_threshold:
+                self._open()
+    
+    def _open(self):
+        """Open the breaker and start the cooldown"""
+        self._transition('open')
+        self.opened_at = time.monotonic()
+    
+    def _transition(self, state):
+        """Change state and log the transition"""
+        logger.warning(f"RPC circuit breaker {self.state} -> {state} (cooldown {self.cooldown}s)")
+        self.state = state
+
 class BitcoinRPC:
     """
     Bitcoin RPC client to interact with a local Bitcoin node
     """
     
-    def __init__(self, config_file='config.ini', max_retries=3, retry_delay=2):
-        """Initialize the Bitcoin RPC client with configuration"""
-        self.config = configparser.ConfigParser()
-        self.config.read(config_file)
+    # Seconds to reuse the result of a read-only RPC call
+    CACHE_TTL = {
+        'getblocktemplate': 1,
+        'getblockchaininfo': 2,
+        'getmininginfo': 2,
+        'getnetworkhashps': 30
+    }
+    
+    def __init__(self, config_file='config.ini', max_retries=3, retry_delay=2,
+                 pool_size=8, timeout=30, config=None):
+        """
+        Initialize the Bitcoin RPC client with configuration
+        
+        pool_size: Number of keep-alive connections shared between callers
+        timeout: Socket timeout in seconds for each RPC request
+        config: Already parsed ConfigParser to use instead of reading config_file
+        """
+        if config is None:
+            config = configparser.ConfigParser()
+            config.read(config_file)
+        self.config = config
         
         self.host = self.config.get('bitcoind', 'rpchost')
         self.port = self.config.getint('bitcoind', 'rpcport')
@@ -31,22 +113,41 @@ class BitcoinRPC:
         self.rpc_url = f'http://{self.user}:{self.password}@{self.host}:{self.port}'
         self.max_retries = max_retries
         self.retry_delay = retry_delay
-        self.rpc_connection = None
+        self.pool_size = pool_size
+        self.timeout = timeout
+        
+        # Pool of persistent connections; each caller checks one out per call
+        self._pool = queue.Queue(maxsize=pool_size)
+        
+        # Fail fast instead of tying up callers while the node is down
+        self._breaker = _CircuitBreaker()
+
+        # Short-lived cache of read-only RPC results
+        self._cache = {}
+        self._cache_lock = threading.Lock()
         
         # Create RPC connection
         self._connect()
     
+    def _new_proxy(self):
+        """Create a new RPC proxy (the HTTP connection is opened on first use)"""
+        return AuthServiceProxy(self.rpc_url, timeout=self.timeout)
+    
     def _connect(self):
-        """Establish connection to the Bitcoin node"""
+        """Establish connection to the Bitcoin node and fill the connection pool"""
         retries = 0
         last_error = None
         
         while retries < self.max_retries:
             try:
-                self.rpc_connection = AuthServiceProxy(self.rpc_url, timeout=30)
-                # Test connection
-                self.get_blockchain_info()
+                proxy = self._new_proxy()
+                # Test connection (bypassing the cache so the node is really hit)
+                proxy.getblockchaininfo()
                 logger.info(f"Successfully connected to Bitcoin node at {self.host}:{self.port}")
+                
+                self._pool.put(proxy)
+                while not self._pool.full():
+                    self._pool.put(self._new_proxy())
                 return
             except Exception as e:
                 last_error = e
@@ -59,46 +160,88 @@ class BitcoinRPC:
         raise last_error
     
     def _call_with_retry(self, method, *args):
-        """Make an RPC call with retry logic"""
+        """
+        Make an RPC call on a pooled connection with retry logic
+        
+        method: Callable invoked as method(proxy, *args)
+        """
         retries = 0
         last_error = None
         
         while retries < self.max_retries:
+            if not self._breaker.allow():
+                raise ConnectionError("Bitcoin node unavailable (RPC circuit breaker open)")
+            
+            proxy = self._pool.get()
             try:
-                if self.rpc_connection is None:
-                    self._connect()
-                return method(*args)
+                result = method(proxy, *args)
+                self._breaker.record_success()
+                return result
             except (JSONRPCException, socket.error, ConnectionRefusedError, BrokenPipeError) as e:
                 last_error = e
                 retries += 1
                 logger.warning(f"RPC call attempt {retries} failed: {str(e)}")
                 
-                # For connection errors, try to reconnect
+                # For connection errors, replace the broken connection with a fresh one
                 if isinstance(e, (socket.error, ConnectionRefusedError, BrokenPipeError)):
-                    self.rpc_connection = None
-                    self._connect()
-                
-                if retries < self.max_retries:
-                    time.sleep(self.retry_delay)
+                    self._breaker.record_failure()
+                    proxy = self._new_proxy()
+                else:
+                    # The node answered, it just returned an error
+                    self._breaker.record_success()
+            finally:
+                self._pool.put(proxy)
+            
+            # Back off exponentially between attempts
+            if retries < self.max_retries:
+                time.sleep(min(self.retry_delay * 2 ** (retries - 1), 30))
         
         logger.error(f"RPC call failed after {self.max_retries} attempts: {str(last_error)}")
         raise last_error
     
+    def _cached_call(self, rpc_method, args, call_method):
+        """Return a cached result for rpc_method/args if still fresh, otherwise call with retry"""
+        key = (rpc_method, args)
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() < entry[0]:
+                return entry[1]
+        
+        result = self._call_with_retry(call_method)
+        
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.CACHE_TTL[rpc_method], result)
+        return result
+    
+    def clear_cache(self):
+        """Drop all cached RPC results"""
+        with self._cache_lock:
+            self._cache.clear()
+    
     def get_blockchain_info(self):
         """Get information about the blockchain"""
+        def call_method(proxy):
+            return proxy.getblockchaininfo()
+        
         try:
-            return self.rpc_connection.getblockchaininfo()
+            return self._cached_call('getblockchaininfo', (), call_method)
         except Exception as e:
             logger.error(f"RPC Error: {str(e)}")
             raise
     
     def get_mining_info(self):
         """Get mining-related information"""
-        return self._call_with_retry(self.rpc_connection.getmininginfo)
+        def call_method(proxy):
+            return proxy.getmininginfo()
+        
+        return self._cached_call('getmininginfo', (), call_method)
     
     def get_network_hashps(self):
         """Get the estimated network hashes per second"""
-        return self._call_with_retry(self.rpc_connection.getnetworkhashps)
+        def call_method(proxy):
+            return proxy.getnetworkhashps()
+        
+        return self._cached_call('getnetworkhashps', (), call_method)
     
     def get_block_template(self, capabilities=None):
         """
@@ -110,10 +253,10 @@ class BitcoinRPC:
         if capabilities:
             params['capabilities'] = capabilities
         
-        def call_method():
-            return self.rpc_connection.getblocktemplate(params)
+        def call_method(proxy):
+            return proxy.getblocktemplate(params)
         
-        return self._call_with_retry(call_method)
+        return self._cached_call('getblocktemplate', tuple(capabilities or ()), call_method)
     
     def submit_block(self, hex_data):
         """
@@ -121,15 +264,36 @@ class BitcoinRPC:
         
         hex_data: Block data in hex
         """
-        def call_method():
-            return self.rpc_connection.submitblock(hex_data)
+        def call_method(proxy):
+            return proxy.submitblock(hex_data)
+        
+        result = self._call_with_retry(call_method)
+        
+        # A null result means the block was accepted, so cached chain state is stale
+        if result is None:
+            self.clear_cache()
+        
+        return result
+    
+    def batch(self, calls):
+        """
+        Make several RPC calls in a single HTTP round trip
+        
+        calls: List of (method, params) tuples, e.g. [('getmininginfo', [])]
+        
+        Returns the results in the same order as the calls
+        """
+        def call_method(proxy):
+            # batch_ pops the method name off each list, so build fresh lists
+            # for every attempt
+            return proxy.batch_([[method] + list(params) for method, params in calls])
         
         return self._call_with_retry(call_method)
     
     def validate_address(self, address):
         """Validate a bitcoin address"""
-        def call_method():
-            return self.rpc_connection.validateaddress(address)
+        def call_method(proxy):
+            return proxy.validateaddress(address)
         
         return self._call_with_retry(call_method)
 
@@ -4,28 +4,42 @@
 import os
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from gtts import gTTS
 import markdown
 from bs4 import BeautifulSoup
 
+# Markdown constructs to rewrite for TTS, matched in a single pass
+_RE_MARKDOWN = re.compile(
+    r'(?s:(?P<diagram>```mermaid.*?```))'
+    r'|(?s:(?P<code_block>```.*?```))'
+    r'|`(?P<inline_code>[^`]+)`'
+    r'|(?P<image>!\[.*?\]\(.*?\))'
+    r'|\[(?P<link>.*?)\]\(.*?\)'
+)
+_MARKDOWN_PLACEHOLDERS = {
+    'diagram': 'Diagram omitted for audio version.',
+    'code_block': 'Code block omitted for audio version.',
+    'image': 'Image omitted for audio version.'
+}
+
+# Patterns used to add pauses to the extracted text
+_RE_HEADING = re.compile(r'(#.*?)(\n)')
+_RE_PARAGRAPH = re.compile(r'(\n\n)')
+
+def _replace_markdown(match):
+    """Replace one matched markdown construct"""
+    kind = match.lastgroup
+    if kind in _MARKDOWN_PLACEHOLDERS:
+        # Remove code blocks, mermaid diagrams and image references
+        return _MARKDOWN_PLACEHOLDERS[kind]
+    
+    # Remove inline code and links but keep the text
+    return match.group(kind)
+
 def clean_markdown(md_content):
     """Clean markdown content to make it more suitable for TTS"""
-    # Remove code blocks
-    md_content = re.sub(r'```.*?```', 'Code block omitted for audio version.', md_content, flags=re.DOTALL)
-    
-    # Remove inline code
-    md_content = re.sub(r'`([^`]+)`', r'\1', md_content)
-    
-    # Remove mermaid diagrams
-    md_content = re.sub(r'```mermaid.*?```', 'Diagram omitted for audio version.', md_content, flags=re.DOTALL)
-    
-    # Remove image references
-    md_content = re.sub(r'!\[.*?\]\(.*?\)', 'Image omitted for audio version.', md_content)
-    
-    # Remove links but keep the text
-    md_content = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', md_content)
-    
-    return md_content
+    return _RE_MARKDOWN.sub(_replace_markdown, md_content)
 
 def markdown_to_text(md_content):
     """Convert markdown to plain text for TTS"""
@@ -42,13 +56,25 @@ def markdown_to_text(md_content):
     text = soup.get_text()
     
     # Add pauses after headings and paragraphs
-    text = re.sub(r'(#.*?)(\n)', r'\1. \2\2', text)
-    text = re.sub(r'(\n\n)', r'. \1', text)
+    text = _RE_HEADING.sub(r'\1. \2\2', text)
+    text = _RE_PARAGRAPH.sub(r'. \1', text)
     
     return text
 
-def convert_file_to_audio(md_file, output_dir):
-    """Convert a markdown file to an audio file"""
+def save_chunk_to_audio(chunk, output_file):
+    """Convert a single chunk of text to an audio file"""
+    tts = gTTS(text=chunk, lang='en', slow=False)
+    tts.save(output_file)
+    
+    print(f"Created {output_file}")
+
+def convert_file_to_audio(md_file, output_dir, executor=None):
+    """
+    Convert a markdown file to an audio file
+    
+    executor: Optional executor to run the TTS requests on; when given, the
+              futures for each chunk are returned instead of waiting for them
+    """
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
@@ -67,36 +93,61 @@ def convert_file_to_audio(md_file, output_dir):
     chunks = [text[i:i+max_chars] for i in range(0, len(text), max_chars)]
     
     # Convert each chunk to audio
+    futures = []
     for i, chunk in enumerate(chunks):
         output_file = f"{output_dir}/{base_name}_part{i+1}.mp3" if len(chunks) > 1 else f"{output_dir}/{base_name}.mp3"
         print(f"Converting {md_file} to {output_file}...")
         
-        # Convert to audio
-        tts = gTTS(text=chunk, lang='en', slow=False)
-        tts.save(output_file)
-        
-        print(f"Created {output_file}")
+        if executor is None:
+            save_chunk_to_audio(chunk, output_file)
+        else:
+            futures.append(executor.submit(save_chunk_to_audio, chunk, output_file))
+    
+    return futures
+
+def iter_markdown_files(directory):
+    """Yield the paths of all markdown files under a directory"""
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.endswith('.md'):
+                yield entry.path
+    
+    for subdir in subdirs:
+        yield from iter_markdown_files(subdir)
 
-def process_directory(input_dir, output_dir):
-    """Process all markdown files in a directory"""
-    # Get all markdown files
-    md_files = []
-    for root, dirs, files in os.walk(input_dir):
-        for file in files:
-            if file.endswith('.md'):
-                md_files.append(os.path.join(root, file))
-    
-    # Sort files to process index.md first
-    md_files.sort(key=lambda x: 0 if x.endswith('index.md') else 1)
-    
-    # Process each file
-    for md_file in md_files:
-        # Create relative output path
-        rel_path = os.path.relpath(md_file, input_dir)
-        rel_dir = os.path.dirname(rel_path)
-        output_path = os.path.join(output_dir, rel_dir)
+def process_directory(input_dir, output_dir, max_workers=4):
+    """
+    Process all markdown files in a directory
+    
+    max_workers: Maximum number of concurrent TTS requests
+    """
+    # Get all markdown files, with index.md files first
+    index_files = []
+    other_files = []
+    for md_file in iter_markdown_files(input_dir):
+        if md_file.endswith('index.md'):
+            index_files.append(md_file)
+        else:
+            other_files.append(md_file)
+    
+    # Process each file; the TTS requests are network bound, so run them on a
+    # small thread pool (sized to stay within gTTS rate limits)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for md_file in index_files + other_files:
+            # Create relative output path
+            rel_path = os.path.relpath(md_file, input_dir)
+            rel_dir = os.path.dirname(rel_path)
+            output_path = os.path.join(output_dir, rel_dir)
+            
+            futures.extend(convert_file_to_audio(md_file, output_path, executor))
         
-        convert_file_to_audio(md_file, output_path)
+        # Re-raise any conversion error
+        for future in futures:
+            future.result()
 
 if __name__ == "__main__":
     # Set input and output directories
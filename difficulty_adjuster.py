@@ -4,10 +4,26 @@
 import time
 import logging
 import threading
-from collections import defaultdict, deque
 
 logger = logging.getLogger(__name__)
 
+# Number of independently locked client tables (must be a power of two)
+STRIPE_COUNT = 16
+
+# Weight of the newest sample in the moving average of share intervals
+SHARE_INTERVAL_EMA_WEIGHT = 0.2
+
+class ClientState:
+    """Per-client difficulty state"""
+    
+    __slots__ = ('difficulty', 'last_share_time', 'share_interval', 'inactive_count')
+    
+    def __init__(self, difficulty):
+        self.difficulty = difficulty
+        self.last_share_time = None
+        self.share_interval = 0.0  # Moving average of seconds between shares
+        self.inactive_count = 0
+
 class DifficultyAdjuster:
     """
     Dynamically adjust mining difficulty for each client
@@ -40,57 +56,72 @@ class DifficultyAdjuster:
         self.no_share_timeout = no_share_timeout
         self.inactive_adjustment_factor = inactive_adjustment_factor
         
-        # Track share times per client
-        self.client_share_times = defaultdict(lambda: deque(maxlen=10))
-        self.client_difficulties = {}
-        self.inactive_count = defaultdict(int)  
-        self.lock = threading.RLock()
+        # Precompute the share time window and the decrease multiplier
+        variance = target_share_time * variance_percent * 0.01
+        self._lower_bound = target_share_time - variance
+        self._upper_bound = target_share_time + variance
+        self._inv_adjustment_factor = 1.0 / adjustment_factor
+        
+        # Difficulty, share times and inactivity tracked per client, spread
+        # across stripes so clients on different stripes never contend
+        self._stripes = [(threading.Lock(), {}) for _ in range(STRIPE_COUNT)]
+    
+    def _stripe(self, client_id):
+        """Get the (lock, clients) stripe that owns a client"""
+        return self._stripes[hash(client_id) & (STRIPE_COUNT - 1)]
     
     def get_difficulty(self, client_id):
         """Get the current difficulty for a client"""
-        with self.lock:
-            return self.client_difficulties.get(client_id, self.initial_difficulty)
+        lock, clients = self._stripe(client_id)
+        with lock:
+            state = clients.get(client_id)
+            return state.difficulty if state is not None else self.initial_difficulty
+    
+    def get_client_difficulties(self):
+        """Get a snapshot of the current difficulty of every known client"""
+        difficulties = {}
+        for lock, clients in self._stripes:
+            with lock:
+                for client_id, state in clients.items():
+                    difficulties[client_id] = state.difficulty
+        return difficulties
     
     def record_share(self, client_id, timestamp=None):
         """Record a share submission time for a client"""
         if timestamp is None:
             timestamp = time.time()
             
-        with self.lock:
+        lock, clients = self._stripe(client_id)
+        with lock:
             # Initialize client if not seen before
-            if client_id not in self.client_difficulties:
-                self.client_difficulties[client_id] = self.initial_difficulty
+            state = clients.get(client_id)
+            if state is None:
+                state = clients[client_id] = ClientState(self.initial_difficulty)
                 
             # Record share time
-            share_times = self.client_share_times[client_id]
-            if share_times:
-                # Calculate time since last share
-                time_since_last = timestamp - share_times[-1]
-                share_times.append(timestamp)
-                
-                # Only consider increasing difficulty if share came in within 5 seconds
-                if time_since_last <= 5:
-                    # Check if we need to adjust difficulty
-                    return self._check_adjust_difficulty(client_id, time_since_last)
+            last_share_time = state.last_share_time
+            state.last_share_time = timestamp
+            if last_share_time is not None:
+                # Calculate time since last share and fold it into the average
+                time_since_last = timestamp - last_share_time
+                if state.share_interval:
+                    state.share_interval += SHARE_INTERVAL_EMA_WEIGHT * (time_since_last - state.share_interval)
                 else:
-                    # If share took longer than 5 seconds, don't adjust difficulty
-                    return False, self.client_difficulties[client_id]
+                    state.share_interval = time_since_last
+                
+                # Decide on the smoothed interval, so one lucky or unlucky
+                # share does not move the difficulty on its own
+                return self._check_adjust_difficulty(client_id, state, state.share_interval)
             else:
-                # First share, just record the time
-                share_times.append(timestamp)
-                return False, self.client_difficulties[client_id]
+                # First share, the time is all there is to record
+                return False, state.difficulty
     
-    def _check_adjust_difficulty(self, client_id, time_since_last):
+    def _check_adjust_difficulty(self, client_id, state, share_interval):
         """Check if difficulty needs adjustment and adjust if necessary"""
-        current_diff = self.client_difficulties[client_id]
+        current_diff = state.difficulty
         
-        # Calculate variance thresholds
-        variance = self.target_share_time * (self.variance_percent / 100)
-        lower_bound = self.target_share_time - variance
-        upper_bound = self.target_share_time + variance
-        
-        # Only increase difficulty if shares are coming very fast AND time since last share is not too high
-        if time_since_last < lower_bound and time_since_last <= 10:
+        # Only increase difficulty if shares are coming very fast AND time between shares is not too high
+        if share_interval < self._lower_bound and share_interval <= 10:
             # Shares coming too fast, increase difficulty
             new_diff = min(
                 current_diff * self.adjustment_factor,
@@ -98,18 +129,21 @@ class DifficultyAdjuster:
             )
             if new_diff != current_diff:
                 logger.debug(f"Increasing difficulty for {client_id} from {current_diff} to {new_diff}")
-                self.client_difficulties[client_id] = new_diff
+                state.difficulty = new_diff
+                # Shares take proportionally longer at the new difficulty
+                state.share_interval *= new_diff / current_diff
                 return True, new_diff
                 
-        elif time_since_last > upper_bound:
+        elif share_interval > self._upper_bound:
             # Shares coming too slow, decrease difficulty
             new_diff = max(
-                current_diff / self.adjustment_factor,
+                current_diff * self._inv_adjustment_factor,
                 self.min_difficulty
             )
             if new_diff != current_diff:
                 logger.debug(f"Decreasing difficulty for {client_id} from {current_diff} to {new_diff}")
-                self.client_difficulties[client_id] = new_diff
+                state.difficulty = new_diff
+                state.share_interval *= new_diff / current_diff
                 return True, new_diff
         
         # No adjustment needed
@@ -117,13 +151,17 @@ class DifficultyAdjuster:
     
     def suggest_difficulty(self, client_id, suggested_diff):
         """Handle a difficulty suggestion from a client"""
-        with self.lock:
+        lock, clients = self._stripe(client_id)
+        with lock:
             # Cap the suggestion within our bounds
             capped_diff = max(min(suggested_diff, self.max_difficulty), self.min_difficulty)
             
             # Always use the suggestion, even for existing clients
-            old_diff = self.client_difficulties.get(client_id, self.initial_difficulty)
-            self.client_difficulties[client_id] = capped_diff
+            state = clients.get(client_id)
+            if state is None:
+                state = clients[client_id] = ClientState(self.initial_difficulty)
+            old_diff = state.difficulty
+            state.difficulty = capped_diff
             logger.info(f"Using suggested difficulty {capped_diff} for client {client_id}")
             
             # Return whether the difficulty changed and the new difficulty
@@ -137,35 +175,36 @@ class DifficultyAdjuster:
         current_time = time.time()
         adjusted_clients = []
         
-        with self.lock:
-            for client_id, share_times in self.client_share_times.items():
-                if not share_times:
-                    continue
-                    
-                last_share_time = share_times[-1]
-                time_since_last = current_time - last_share_time
-                
-                # If no share in the timeout period, halve the difficulty
-                if time_since_last > self.no_share_timeout:
-                    current_diff = self.client_difficulties[client_id]
-                    
-                    # Only lower if above minimum
-                    if current_diff > self.min_difficulty:
-                        # Directly halve the difficulty (more aggressive than before)
-                        new_diff = max(
-                            current_diff / 2,  # Halve the difficulty
-                            self.min_difficulty
-                        )
+        # Walk one stripe at a time so share submissions on other stripes are not blocked
+        for lock, clients in self._stripes:
+            with lock:
+                for client_id, state in clients.items():
+                    if state.last_share_time is None:
+                        continue
                         
-                        logger.info(f"Client {client_id} inactive for {time_since_last:.1f}s. "
-                                   f"Halving difficulty from {current_diff} to {new_diff}")
+                    time_since_last = current_time - state.last_share_time
+                    
+                    # If no share in the timeout period, halve the difficulty
+                    if time_since_last > self.no_share_timeout:
+                        current_diff = state.difficulty
                         
-                        self.client_difficulties[client_id] = new_diff
-                        adjusted_clients.append((client_id, new_diff))
-                else:
-                    # Reset inactive count if client has submitted a share within timeout
-                    if client_id in self.inactive_count and self.inactive_count[client_id] > 0:
-                        logger.info(f"Client {client_id} is active again, resetting inactive count")
-                        self.inactive_count[client_id] = 0
+                        # Only lower if above minimum
+                        if current_diff > self.min_difficulty:
+                            # Directly halve the difficulty (more aggressive than before)
+                            new_diff = max(
+                                current_diff / 2,  # Halve the difficulty
+                                self.min_difficulty
+                            )
+                            
+                            logger.info(f"Client {client_id} inactive for {time_since_last:.1f}s. "
+                                       f"Halving difficulty from {current_diff} to {new_diff}")
+                            
+                            state.difficulty = new_diff
+                            adjusted_clients.append((client_id, new_diff))
+                    else:
+                        # Reset inactive count if client has submitted a share within timeout
+                        if state.inactive_count > 0:
+                            logger.info(f"Client {client_id} is active again, resetting inactive count")
+                            state.inactive_count = 0
         
         return adjusted_clients
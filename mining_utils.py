@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import functools
 import hashlib
 import binascii
 import struct
@@ -13,26 +14,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# hashlib is backed by OpenSSL, which already uses the SHA extensions
+# (SHA-NI / ARMv8 SHA2) on CPUs that have them
+_sha256 = hashlib.sha256
+
+# Bitcoin's difficulty 1 target
+DIFF1_TARGET = 0x00ffff << (8 * (0x1d - 3))
+
 def uint256_from_str(s):
     """Convert a byte string to a 256-bit integer"""
-    r = 0
-    t = s[::-1]  # Reverse the byte order
-    for i in range(len(t)):
-        r += int(t[i]) << (i * 8)
-    return r
+    return int.from_bytes(s, byteorder='big')
 
 def uint256_to_str(u):
     """Convert a 256-bit integer to a byte string"""
-    rs = b''
-    for i in range(32):
-        rs += bytes([u & 0xFF])
-        u >>= 8
-    return rs
+    # Mask to 256 bits so oversized values truncate instead of raising
+    return (int(u) & ((1 << 256) - 1)).to_bytes(32, byteorder='little')
+
+def double_sha256(data, _s=_sha256):
+    """Return SHA-256(SHA-256(data)), the hash used for transactions, merkle nodes and headers"""
+    return _s(_s(data).digest()).digest()
 
 def reverse_bytes(data):
     """Reverse the byte order of a hex string"""
-    b = binascii.unhexlify(data)
-    return binascii.hexlify(b[::-1])
+    return binascii.unhexlify(data)[::-1].hex().encode()
+
+def calculate_merkle_root_bytes(hashes):
+    """Calculate the Merkle root from a list of raw 32-byte transaction hashes"""
+    if not hashes:
+        return None
+    
+    level = list(hashes)
+    while len(level) > 1:
+        # Make sure we have an even number of hashes
+        if len(level) % 2 == 1:
+            level.append(level[-1])
+        
+        # Concatenate and hash each pair
+        level = [double_sha256(level[i] + level[i+1]) for i in range(0, len(level), 2)]
+    
+    return level[0]
 
 def calculate_merkle_root(txids):
     """Calculate the Merkle root from a list of transaction IDs"""
@@ -42,52 +62,52 @@ def calculate_merkle_root(txids):
     if len(txids) == 1:
         return txids[0]
     
-    # Make sure we have an even number of txids
-    if len(txids) % 2 == 1:
-        txids.append(txids[-1])
-    
-    next_level = []
-    for i in range(0, len(txids), 2):
-        # Concatenate and hash the pair
-        concat = binascii.unhexlify(txids[i]) + binascii.unhexlify(txids[i+1])
-        next_level.append(binascii.hexlify(hashlib.sha256(hashlib.sha256(concat).digest()).digest()).decode())
-    
-    # Recursive call to process the next level
-    return calculate_merkle_root(next_level)
+    # Decode once and work on raw 32-byte digests until the root is found
+    return calculate_merkle_root_bytes([bytes.fromhex(txid) for txid in txids]).hex()
+
+# Most recent block template and its decoded txids
+_decoded_txids_cache = [None, None]
+
+def _decode_template_txids(block_template):
+    """Decode a block template's txids, reusing the result for the same template"""
+    cached_template, decoded = _decoded_txids_cache
+    if cached_template is not block_template:
+        decoded = [bytes.fromhex(tx.get('txid', '')) for tx in block_template.get('transactions', [])]
+        # Holding the template keeps its id from being reused while cached
+        _decoded_txids_cache[:] = [block_template, decoded]
+    return decoded
 
 def create_coinbase(height, coinbase_value, coinbase_message, address):
     """Create a coinbase transaction"""
-    # Coinbase input script contains the block height and arbitrary data
-    script_sig = (
-        # Height (BIP34)
-        bytes([len(struct.pack('<I', height))]) + 
-        struct.pack('<I', height) +
-        # Arbitrary data (limited to 100 bytes)
-        bytes([min(len(coinbase_message), 100)]) + 
-        coinbase_message[:100]
-    )
+    # Height (BIP34) pushed the way nodes expect it: OP_1 to OP_16 for small
+    # heights, otherwise a minimally encoded script number; the extra bit
+    # leaves room for the sign bit so e.g. 128 becomes 80 00
+    if 1 <= height <= 16:
+        height_push = bytes([0x50 + height])
+    else:
+        height_bytes = height.to_bytes((height.bit_length() + 8) // 8, byteorder='little')
+        height_push = bytes([len(height_bytes)]) + height_bytes
     
-    # Create the transaction
-    coinbase = struct.pack('<I', 1)  # Version
-    coinbase += bytes([1])  # Number of inputs
-    coinbase += bytes([0] * 32)  # Previous output hash (null for coinbase)
-    coinbase += struct.pack('<I', 0xFFFFFFFF)  # Previous output index
-    coinbase += bytes([len(script_sig)])  # Script length
-    coinbase += script_sig  # Script sig
-    coinbase += struct.pack('<I', 0)  # Sequence
-    coinbase += bytes([1])  # Number of outputs
-    coinbase += struct.pack('<Q', coinbase_value)  # Output value
+    # Coinbase input script contains the block height and arbitrary data
+    # (limited to 100 bytes)
+    message = coinbase_message[:100]
+    script_sig = height_push + bytes([len(message)]) + message
     
     # P2PKH script: OP_DUP OP_HASH160 <pubKeyHash> OP_EQUALVERIFY OP_CHECKSIG
     # For simplicity, we'll use a hardcoded P2PKH script to avoid address parsing issues
     # In a real implementation, you would properly parse the address
     script_pubkey = bytes.fromhex('76a91488ac')  # Placeholder script
     
-    coinbase += bytes([len(script_pubkey)])  # Script length
-    coinbase += script_pubkey  # Script pubkey
+    # Build the transaction in a single buffer
+    coinbase = bytearray(struct.pack('<IB', 1, 1))  # Version, number of inputs
+    coinbase += bytes(32)  # Previous output hash (null for coinbase)
+    coinbase += struct.pack('<IB', 0xFFFFFFFF, len(script_sig))  # Previous output index, script length
+    coinbase += script_sig
+    coinbase += struct.pack('<IBQB', 0, 1, coinbase_value, len(script_pubkey))  # Sequence, outputs, value, script length
+    coinbase += script_pubkey
     coinbase += struct.pack('<I', 0)  # Lock time
     
-    return binascii.hexlify(coinbase).decode()
+    return coinbase.hex()
 
 def create_block_header(version, prev_block_hash, merkle_root, timestamp, bits, nonce):
     """Create a block header"""
@@ -102,7 +122,7 @@ def create_block_header(version, prev_block_hash, merkle_root, timestamp, bits,
 
 def hash_block_header(header):
     """Double SHA256 hash of a block header"""
-    return hashlib.sha256(hashlib.sha256(header).digest()).digest()
+    return double_sha256(header)
 
 def encode_varint(n):
     """Encode an integer as a varint"""
@@ -115,37 +135,46 @@ def encode_varint(n):
     else:
         return struct.pack('<BQ', 0xff, n)
 
+# Target multipliers for every exponent a valid compact target can use
+_TARGET_SHIFTS = {exp: 1 << (8 * (exp - 3)) for exp in range(3, 34)}
+
 def bits_to_target(bits):
     """Convert compact target representation to full 256-bit target"""
-    # Extract exponent and mantissa
+    # Extract exponent and mantissa; the top mantissa bit is the sign, which
+    # a valid target never sets, so it is dropped as Bitcoin Core does
     exp = bits >> 24
-    mant = bits & 0xFFFFFF
-    
-    # Convert to target
-    if mant > 0x7FFFFF:
-        mant = 0x7FFFFF  # Limit to 23 bits
+    mant = bits & 0x7FFFFF
     
-    target = mant * (1 << (8 * (exp - 3)))
-    return target
+    shift = _TARGET_SHIFTS.get(exp)
+    if shift is None:
+        if exp < 3:
+            return mant >> (8 * (3 - exp))
+        shift = 1 << (8 * (exp - 3))
+    return mant * shift
 
 def is_valid_proof_of_work(block_hash, target):
     """Check if the block hash meets the target difficulty"""
+    # Compare the most significant 64 bits first; almost every hash is
+    # decided there without building the full 256-bit integer
+    top = int.from_bytes(block_hash[24:32], byteorder='little')
+    target_top = target >> 192
+    if top != target_top:
+        return top < target_top
+    
     # Convert block hash to integer (little endian)
     hash_int = int.from_bytes(block_hash, byteorder='little')
     
     # Compare with target
     return hash_int <= target
 
+@functools.lru_cache(maxsize=1024)
 def get_difficulty(bits):
     """Calculate difficulty from bits"""
-    # Bitcoin's difficulty 1 target
-    diff1_target = 0x00ffff * 2**(8*(0x1d - 3))
-    
     # Current target
     current_target = bits_to_target(bits)
     
     # Difficulty is ratio of diff1_target to current target
-    return diff1_target / current_target
+    return DIFF1_TARGET / current_target
 
 def create_mining_job(block_template, coinbase_message, pool_address):
     """Create a mining job from a block template"""
@@ -161,13 +190,12 @@ def create_mining_job(block_template, coinbase_message, pool_address):
         coinbase_value += block_template.get('coinbasevalue', 0)
         
         coinbase_tx = create_coinbase(height, coinbase_value, coinbase_message.encode(), pool_address)
-        coinbase_txid = hashlib.sha256(hashlib.sha256(binascii.unhexlify(coinbase_tx)).digest()).digest()
-        coinbase_txid = binascii.hexlify(coinbase_txid).decode()
+        coinbase_txid = double_sha256(bytes.fromhex(coinbase_tx))
         
-        # Calculate merkle root
+        # Calculate merkle root on raw hashes, hex-encoding only the result
         txids = [coinbase_txid]
-        txids.extend([tx.get('txid', '') for tx in block_template.get('transactions', [])])
-        merkle_root = calculate_merkle_root(txids)
+        txids.extend(_decode_template_txids(block_template))
+        merkle_root = calculate_merkle_root_bytes(txids).hex()
         
         # Create block header template
         header_template = {
@@ -2,82 +2,147 @@
 # -*- coding: utf-8 -*-
 
 import time
+import array
+import queue
+import bisect
 import threading
 import logging
 from collections import deque
 
 logger = logging.getLogger(__name__)
 
+# Seconds of shares used to estimate the pool hashrate
+HASHRATE_WINDOW = 300
+
+class WorkerStats:
+    """Per-worker share counters and state"""
+    
+    __slots__ = ('valid', 'invalid', 'stale', 'last_share_time', 'connection_time',
+                 'difficulty', 'active', 'client_ids', 'blocks', 'lock')
+    
+    def __init__(self, connection_time, last_share_time=0, difficulty=1, client_ids=None):
+        self.valid = 0
+        self.invalid = 0
+        self.stale = 0
+        self.last_share_time = last_share_time
+        self.connection_time = connection_time
+        self.difficulty = difficulty
+        self.active = True
+        self.client_ids = client_ids if client_ids is not None else []
+        self.blocks = []
+        self.lock = threading.Lock()
+
 class PoolStats:
     """
     Track and manage statistics for the mining pool
     """
     
     def __init__(self, window_size=600):  # 10 minute window by default
-        self.shares = {
-            'valid': 0,
-            'invalid': 0,
-            'stale': 0
-        }
+        self.valid_shares = 0
+        self.invalid_shares = 0
+        self.stale_shares = 0
         self.blocks_found = 0
         self.start_time = time.time()
         self.last_share_time = 0
+        self.version = 0  # Bumped on every share, block or stratum command so readers can cache
+        self._pending_shares = queue.SimpleQueue()  # Shares not yet applied by drain_pending
+        self._formatted_workers = (None, None)  # (version, result) of get_formatted_workers
         self.window_size = window_size
-        self.share_times = deque(maxlen=1000)  # Store timestamps of last 1000 shares
+        # Shares in the hashrate window as parallel arrays of doubles: the
+        # timestamps, and the running difficulty total up to and including each
+        # share. Any window's difficulty is then a difference of two totals.
+        # Expired shares are skipped by index and compacted away in bulk.
+        self.share_times = array.array('d')
+        self._share_totals = array.array('d')
+        self._window_start = 0  # Index of the oldest share still in the window
+        self._difficulty_total = 0  # Running total after the newest share
+        self._expired_total = 0  # Running total after the newest expired share
+        self._window_lock = threading.Lock()
         self.hashrate_history = deque(maxlen=100)  # Store last 100 hashrate calculations
-        self.clients = {}
-        self.lock = threading.RLock()
+        self.clients = {}  # Maps worker name to WorkerStats
         
+        # Pool-wide counters are only written from the reactor thread and read
+        # without locking, so readers may see a value one share behind. The
+        # clients dict is guarded only while entries are inserted, and each
+        # WorkerStats carries its own lock for its counters.
+        self._clients_lock = threading.Lock()
+        
+        # Names of active workers, excluding entries keyed by connection address
+        self._active_workers = set()
+
         # Track last stratum method names
         self.last_pool_to_miner_method = ""
         self.last_miner_to_pool_method = ""
         
         # Track last 10 stratum commands with timestamps and sender info
         self.stratum_command_history = deque(maxlen=10)
+
+    def add_share(self, worker_name, valid=True, stale=False, difficulty=1):
+        """Queue a share to be added to the statistics"""
+        self.version += 1
+        self._pending_shares.put((worker_name, valid, stale, difficulty, time.time()))
+    
+    def drain_pending(self, max_shares=None):
+        """
+        Apply queued shares to the statistics
         
-        # Start hashrate calculation thread
-        self.update_thread = threading.Thread(target=self._update_hashrate, daemon=True)
-        self.update_thread.start()
+        max_shares: Maximum number of shares to apply, or None for all of them
+        """
+        pending = self._pending_shares
+        applied = 0
+        while max_shares is None or applied < max_shares:
+            try:
+                share = pending.get_nowait()
+            except queue.Empty:
+                break
+            self._apply_share(*share)
+            applied += 1
+        return applied
     
-    def add_share(self, worker_name, valid=True, stale=False, difficulty=1):
-        """Add a share to the statistics"""
-        with self.lock:
-            current_time = time.time()
-            self.last_share_time = current_time
-            self.share_times.append((current_time, difficulty))
+    def _apply_share(self, worker_name, valid, stale, difficulty, current_time):
+        """Add a queued share to the statistics"""
+        self.last_share_time = current_time
+        with self._window_lock:
+            self._difficulty_total += difficulty
+            self.share_times.append(current_time)
+            self._share_totals.append(self._difficulty_total)
             
-            if valid and not stale:
-                self.shares['valid'] += 1
-                # Update per-worker stats
-                if worker_name not in self.clients:
-                    self.clients[worker_name] = {
-                        'shares': {'valid': 0, 'invalid': 0, 'stale': 0},
-                        'last_share_time': current_time,
-                        'connection_time': current_time,
-                        'difficulty': difficulty,
-                        'active': True
-                    }
-                self.clients[worker_name]['shares']['valid'] += 1
-                self.clients[worker_name]['last_share_time'] = current_time
-                self.clients[worker_name]['difficulty'] = difficulty
-            elif stale:
-                self.shares['stale'] += 1
-                if worker_name in self.clients:
-                    self.clients[worker_name]['shares']['stale'] += 1
-            else:
-                self.shares['invalid'] += 1
-                if worker_name in self.clients:
-                    self.clients[worker_name]['shares']['invalid'] += 1
+        if valid and not stale:
+            self.valid_shares += 1
+            # Update per-worker stats
+            client = self.clients.get(worker_name)
+            if client is None:
+                with self._clients_lock:
+                    client = self.clients.get(worker_name)
+                    if client is None:
+                        client = self.clients[worker_name] = WorkerStats(current_time, current_time, difficulty)
+                self._mark_active(worker_name)
+            with client.lock:
+                client.valid += 1
+                client.last_share_time = current_time
+                client.difficulty = difficulty
+        elif stale:
+            self.stale_shares += 1
+            client = self.clients.get(worker_name)
+            if client is not None:
+                with client.lock:
+                    client.stale += 1
+        else:
+            self.invalid_shares += 1
+            client = self.clients.get(worker_name)
+            if client is not None:
+                with client.lock:
+                    client.invalid += 1
     
     def add_block(self, worker_name, height, hash):
         """Record a found block"""
-        with self.lock:
-            self.blocks_found += 1
-            logger.info(f"BLOCK FOUND by {worker_name} at height {height}! Hash: {hash}")
-            if worker_name in self.clients:
-                if 'blocks' not in self.clients[worker_name]:
-                    self.clients[worker_name]['blocks'] = []
-                self.clients[worker_name]['blocks'].append({
+        self.blocks_found += 1
+        self.version += 1
+        logger.info(f"BLOCK FOUND by {worker_name} at height {height}! Hash: {hash}")
+        client = self.clients.get(worker_name)
+        if client is not None:
+            with client.lock:
+                client.blocks.append({
                     'height': height,
                     'hash': hash,
                     'time': time.time()
@@ -85,186 +150,258 @@ class PoolStats:
     
     def add_client(self, client_id, worker_name=None):
         """Add a new client to statistics"""
-        with self.lock:
-            key = worker_name or client_id
-            if key not in self.clients:
-                self.clients[key] = {
-                    'shares': {'valid': 0, 'invalid': 0, 'stale': 0},
-                    'last_share_time': 0,
-                    'connection_time': time.time(),
-                    'difficulty': 1,
-                    'active': True,
-                    'client_ids': [client_id]
-                }
-            else:
-                # If client exists but was marked inactive, reactivate it
-                self.clients[key]['active'] = True
-                # Add client_id to the list if not already present
-                if client_id not in self.clients[key].get('client_ids', []):
-                    if 'client_ids' not in self.clients[key]:
-                        self.clients[key]['client_ids'] = []
-                    self.clients[key]['client_ids'].append(client_id)
+        key = worker_name or client_id
+        with self._clients_lock:
+            client = self.clients.get(key)
+            if client is None:
+                self.clients[key] = WorkerStats(time.time(), client_ids=[client_id])
+                self._mark_active(key)
+                self.version += 1
+                return
+        
+        with client.lock:
+            # If client exists but was marked inactive, reactivate it
+            client.active = True
+            self.version += 1
+            self._mark_active(key)
+            # Add client_id to the list if not already present
+            if client_id not in client.client_ids:
+                client.client_ids.append(client_id)
     
     def remove_client(self, worker_name):
         """Remove a client from active statistics"""
-        with self.lock:
-            if worker_name in self.clients:
-                # We don't actually delete the client to keep historical data
-                self.clients[worker_name]['active'] = False
+        client = self.clients.get(worker_name)
+        if client is not None:
+            # We don't actually delete the client to keep historical data
+            client.active = False
+            self._active_workers.discard(worker_name)
+            self.version += 1
+    
+    def _mark_active(self, name):
+        """Count a client entry as an active miner unless it is keyed by address"""
+        if not name.startswith('192.168.') and ':' not in name:
+            self._active_workers.add(name)
+
+    def set_worker_difficulty(self, worker_name, difficulty):
+        """Update a worker's current difficulty, returning False if the worker is unknown"""
+        client = self.clients.get(worker_name)
+        if client is None:
+            return False
+        with client.lock:
+            client.difficulty = difficulty
+        return True
     
     def record_pool_to_miner_method(self, method_name, params=None):
         """Record the last method name sent from pool to miner"""
-        with self.lock:
-            self.last_pool_to_miner_method = method_name
-            # Add to command history with timestamp and sender info
-            self.stratum_command_history.append({
-                'timestamp': time.time(),
-                'sender': 'pool',
-                'method': method_name,
-                'params': params
-            })
+        self.last_pool_to_miner_method = method_name
+        self.version += 1
+        # Add to command history with timestamp and sender info; the
+        # display time is formatted once here rather than on every render
+        timestamp = time.time()
+        self.stratum_command_history.append({
+            'timestamp': timestamp,
+            'ts_str': time.strftime('%H:%M:%S', time.localtime(timestamp)),
+            'sender': 'pool',
+            'method': method_name,
+            'params': params
+        })
     
     def record_miner_to_pool_method(self, method_name, params=None):
         """Record the last method name sent from miner to pool"""
-        with self.lock:
-            self.last_miner_to_pool_method = method_name
-            # Add to command history with timestamp and sender info
-            self.stratum_command_history.append({
-                'timestamp': time.time(),
-                'sender': 'miner',
-                'method': method_name,
-                'params': params
-            })
+        self.last_miner_to_pool_method = method_name
+        self.version += 1
+        # Add to command history with timestamp and sender info; the
+        # display time is formatted once here rather than on every render
+        timestamp = time.time()
+        self.stratum_command_history.append({
+            'timestamp': timestamp,
+            'ts_str': time.strftime('%H:%M:%S', time.localtime(timestamp)),
+            'sender': 'miner',
+            'method': method_name,
+            'params': params
+        })
     
     def get_stratum_command_history(self):
         """Get the history of stratum commands"""
-        with self.lock:
-            return list(self.stratum_command_history)
-    
-    def calculate_hashrate(self, window_seconds=300):
-        """Calculate the current hashrate based on shares in the last window_seconds"""
-        with self.lock:
-            if not self.share_times:
+        return list(self.stratum_command_history)
+
+    def _window_difficulty(self, current_time, window_seconds):
+        """Drop shares older than the hashrate window and sum the difficulty of the last window_seconds"""
+        share_times = self.share_times
+        share_totals = self._share_totals
+        cutoff = current_time - HASHRATE_WINDOW
+        with self._window_lock:
+            start = self._window_start
+            if start < len(share_times) and share_times[start] < cutoff:
+                # Timestamps are appended in order, so bisect for the first live share
+                start = bisect.bisect_left(share_times, cutoff, start + 1)
+            if start == len(share_times):
+                # Reset so float rounding can't accumulate across bursts
+                del share_times[:], share_totals[:]
+                self._window_start = 0
+                self._difficulty_total = self._expired_total = 0
                 return 0
             
-            current_time = time.time()
-            # Filter shares within the window
-            recent_shares = [(t, d) for t, d in self.share_times 
-                             if current_time - t <= window_seconds]
+            if start > self._window_start:
+                self._expired_total = share_totals[start - 1]
+                if start * 2 > len(share_times):
+                    # Mostly expired, drop the dead prefix in one go
+                    del share_times[:start], share_totals[:start]
+                    start = 0
+                self._window_start = start
             
-            if not recent_shares:
-                return 0
+            if window_seconds >= HASHRATE_WINDOW:
+                return self._difficulty_total - self._expired_total
             
-            # Calculate hashrate: shares * difficulty * 2^32 / window_seconds
-            total_difficulty = sum(d for _, d in recent_shares)
+            first = bisect.bisect_left(share_times, current_time - window_seconds, start)
+            before = share_totals[first - 1] if first > start else self._expired_total
+            return self._difficulty_total - before
+
+    def calculate_hashrate(self, window_seconds=HASHRATE_WINDOW):
+        """
+        Calculate the current hashrate based on shares in the last window_seconds
             
-            # Avoid division by zero
-            if window_seconds == 0:
-                return 0
+        window_seconds: Window to average over; only the last HASHRATE_WINDOW seconds of shares are kept
+        """
+        # Avoid division by zero
+        if window_seconds <= 0:
+            return 0
+            
+        self.drain_pending()
+        total_difficulty = self._window_difficulty(time.time(), window_seconds)
                 
-            # Each share at difficulty 1 represents 2^32 hashes
-            hashrate = (total_difficulty * 4294967296) / window_seconds
-            return hashrate
+        # Each share at difficulty 1 represents 2^32 hashes
+        hashrate = (total_difficulty * 4294967296) / window_seconds
+        return hashrate
     
     def get_worker_hashrate(self, worker_name, window_seconds=300):
         """Calculate hashrate for a specific worker"""
-        with self.lock:
-            if worker_name not in self.clients:
-                return 0
+        self.drain_pending()
+        client = self.clients.get(worker_name)
+        if client is None:
+            return 0
+        return self._client_hashrate(client, time.time(), window_seconds)
             
-            # Simple estimation based on shares and difficulty
-            shares = self.clients[worker_name]['shares']['valid']
-            difficulty = self.clients[worker_name]['difficulty']
+    @staticmethod
+    def _client_hashrate(client, current_time, window_seconds=300):
+        """Calculate hashrate from a WorkerStats entry"""
+        # Simple estimation based on shares and difficulty
+        shares = client.valid
+        difficulty = client.difficulty
             
-            # Calculate time window
-            current_time = time.time()
-            connection_time = self.clients[worker_name]['connection_time']
-            elapsed = min(current_time - connection_time, window_seconds)
+        # Calculate time window
+        connection_time = client.connection_time
+        elapsed = min(current_time - connection_time, window_seconds)
             
-            if elapsed == 0 or shares == 0:
-                return 0
+        if elapsed == 0 or shares == 0:
+            return 0
                 
-            # Each share at difficulty 1 represents 2^32 hashes
-            hashrate = (shares * difficulty * 4294967296) / elapsed
-            return hashrate
+        # Each share at difficulty 1 represents 2^32 hashes
+        hashrate = (shares * difficulty * 4294967296) / elapsed
+        return hashrate
     
-    def _update_hashrate(self):
-        """Background thread to periodically update hashrate history"""
-        while True:
-            try:
-                hashrate = self.calculate_hashrate()
-                with self.lock:
-                    self.hashrate_history.append((time.time(), hashrate))
-                time.sleep(60)  # Update every minute
-            except Exception as e:
-                logger.error(f"Error updating hashrate: {str(e)}")
-                time.sleep(60)
+    def sample_hashrate(self):
+        """Append the current hashrate to the history (scheduled every minute by the stratum factory)"""
+        try:
+            self.hashrate_history.append((time.time(), self.calculate_hashrate()))
+        except Exception as e:
+            logger.error(f"Error updating hashrate: {str(e)}")
     
     def get_stats(self):
         """Get a dictionary of all statistics"""
-        with self.lock:
-            uptime = time.time() - self.start_time
+        self.drain_pending()
+        uptime = time.time() - self.start_time
+        hashrate = self.calculate_hashrate()
+        clients = list(self.clients.values())
             
-            stats = {
-                'uptime': uptime,
-                'uptime_human': self._format_time(uptime),
-                'shares': dict(self.shares),
-                'blocks_found': self.blocks_found,
-                'hashrate': self.calculate_hashrate(),
-                'hashrate_human': self._format_hashrate(self.calculate_hashrate()),
-                'clients': len([c for c in self.clients.values() if c.get('active', True)]),
-                'total_clients': len(self.clients)
-            }
+        stats = {
+            'uptime': uptime,
+            'uptime_human': self._format_time(uptime),
+            'shares': {'valid': self.valid_shares, 'invalid': self.invalid_shares, 'stale': self.stale_shares},
+            'blocks_found': self.blocks_found,
+            'hashrate': hashrate,
+            'hashrate_human': self._format_hashrate(hashrate),
+            'clients': len([c for c in clients if c.active]),
+            'total_clients': len(clients)
+        }
             
-            return stats
+        return stats
     
     def get_worker_stats(self):
         """Get statistics for all workers"""
-        with self.lock:
-            worker_stats = {}
-            for worker_name, data in self.clients.items():
-                if not data.get('active', True):
-                    continue
+        self.drain_pending()
+        worker_stats = {}
+        current_time = time.time()
+        for worker_name, data in list(self.clients.items()):
+            if not data.active:
+                continue
                     
-                hashrate = self.get_worker_hashrate(worker_name)
-                worker_stats[worker_name] = {
-                    'shares': dict(data['shares']),
-                    'hashrate': hashrate,
-                    'hashrate_human': self._format_hashrate(hashrate),
-                    'last_share_time': data['last_share_time'],
-                    'last_share_ago': self._format_time(time.time() - data['last_share_time']) if data['last_share_time'] > 0 else 'Never',
-                    'difficulty': data['difficulty']
-                }
+            hashrate = self._client_hashrate(data, current_time)
+            last_share_time = data.last_share_time
+            worker_stats[worker_name] = {
+                'shares': {'valid': data.valid, 'invalid': data.invalid, 'stale': data.stale},
+                'hashrate': hashrate,
+                'hashrate_human': self._format_hashrate(hashrate),
+                'last_share_time': last_share_time,
+                'last_share_ago': self._format_time(current_time - last_share_time) if last_share_time > 0 else 'Never',
+                'difficulty': data.difficulty
+            }
             
-            return worker_stats
+        return worker_stats
+    
+    def get_formatted_workers(self):
+        """
+        Get the share counts of all active workers, flattened for the web layer
+        
+        The result is shared between callers until the stats change, so it must not be modified.
+        """
+        self.drain_pending()
+        version, formatted = self._formatted_workers
+        if version == self.version:
+            return formatted
+        
+        version = self.version
+        formatted = {
+            worker_name: {
+                'valid_shares': data.valid,
+                'invalid_shares': data.invalid,
+                'blocks_found': len(data.blocks),
+                'last_share_time': data.last_share_time
+            }
+            for worker_name, data in list(self.clients.items())
+            if data.active
+        }
+        self._formatted_workers = (version, formatted)
+        return formatted
     
     def get_pool_stats(self):
         """Get pool statistics for the web interface"""
-        with self.lock:
-            current_time = time.time()
+        self.drain_pending()
+        current_time = time.time()
+        valid_shares = self.valid_shares
+        invalid_shares = self.invalid_shares
             
-            # Calculate total shares
-            total_shares = self.shares['valid'] + self.shares['invalid'] + self.shares['stale']
+        # Calculate total shares
+        total_shares = valid_shares + invalid_shares + self.stale_shares
             
-            # Get current hashrate
-            hashrate = self.calculate_hashrate()
+        # Get current hashrate
+        hashrate = self.calculate_hashrate()
             
-            # Count active miners - only count workers, not connections
-            active_miners = len([name for name, data in self.clients.items() 
-                               if data.get('active', True) and not name.startswith('192.168.')])
+        # Count active miners - only count workers, not connections
+        active_miners = len(self._active_workers)
             
-            return {
-                'hashrate': hashrate,
-                'total_shares': total_shares,
-                'valid_shares': self.shares['valid'],
-                'invalid_shares': self.shares['invalid'],
-                'blocks_found': self.blocks_found,
-                'connected_miners': active_miners,
-                'uptime': current_time - self.start_time,
-                'last_pool_to_miner_method': self.last_pool_to_miner_method,
-                'last_miner_to_pool_method': self.last_miner_to_pool_method,
-                'stratum_command_history': self.get_stratum_command_history()
-            }
+        return {
+            'hashrate': hashrate,
+            'total_shares': total_shares,
+            'valid_shares': valid_shares,
+            'invalid_shares': invalid_shares,
+            'blocks_found': self.blocks_found,
+            'connected_miners': active_miners,
+            'uptime': current_time - self.start_time,
+            'last_pool_to_miner_method': self.last_pool_to_miner_method,
+            'last_miner_to_pool_method': self.last_miner_to_pool_method,
+            'stratum_command_history': self.get_stratum_command_history()
+        }
     
     @staticmethod
     def _format_hashrate(hashrate):
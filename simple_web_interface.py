@@ -1,14 +1,507 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os
 import json
+import functools
+import gzip
+import hashlib
 import time
-import re
+import string
 import logging
 from twisted.web import server, resource
-from twisted.internet import reactor
-from datetime import datetime
+from twisted.internet import reactor, task
+from twisted.internet.threads import deferToThread
+from html import escape
+from urllib.parse import parse_qs, urlsplit
+
+from mining_utils import get_difficulty
+
+try:
+    import orjson
+except ImportError:  # Optional, falls back to the stdlib encoder
+    orjson = None
+
+# Seconds a rendered stats page is served again before it is rebuilt
+PAGE_CACHE_TTL = 1
+
+# Seconds a serialized API response is served again before it is rebuilt
+API_CACHE_TTL = 1
+
+# Worker count above which API responses are serialized off the reactor thread
+THREADED_JSON_MIN_WORKERS = 256
+
+def _dumps_json(obj, pretty=False):
+    """Serialize an API response to UTF-8 JSON bytes, indented if pretty is set"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2) if pretty else orjson.dumps(obj)
+    if pretty:
+        return json.dumps(obj, indent=2).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def _query_args(request):
+    """
+    Get the query arguments of a request, including ones given without a value
+    
+    request.args drops items with no '=', so a bare ?pretty would be lost there.
+    """
+    return parse_qs(urlsplit(request.uri).query, keep_blank_values=True)
+
+def _encode_response(response, pretty=False):
+    """Serialize an API response once, as (body, gzipped body)"""
+    body = _dumps_json(response, pretty)
+    return body, gzip.compress(body, 6)
+
+def _format_elapsed(seconds):
+    """Format whole elapsed seconds as '5 seconds', '2m 5s' or '1h 2m'"""
+    minutes, seconds = divmod(seconds, 60)
+    if minutes >= 60:
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds} seconds"
+
+def _time_since_share(last_share_time, now):
+    """Format the time since a worker's last share, or 'Never' if it has none"""
+    if last_share_time > 0:
+        return _format_elapsed(int(now - last_share_time))
+    return "Never"
+
+# Stylesheet for the stats page, served separately so browsers can cache it
+_PAGE_CSS = """body {
+    background-color: #000000;
+    color: #eee;
+    font-family: 'Courier New', monospace;
+    margin: 0;
+    padding: 20px;
+}
+.card {
+    background-color: #000000;
+    border-radius: 8px;
+    padding: 20px;
+    margin-bottom: 20px;
+    box-shadow: 0 4px 8px rgba(0, 0, 0, 0.2);
+}
+h1, h2 {
+    color: #0066cc;
+    text-align: center;
+}
+.bitcoin-logo {
+    color: #FF8000;
+    font-size: 24px;
+    font-weight: bold;
+    margin-left: 10px;
+}
+.stats-container {
+    display: grid;
+    grid-template-columns: 1fr 1fr;
+    grid-template-rows: 1fr 1fr;
+    gap: 40px;
+    margin: 40px auto;
+    max-width: 500px;
+}
+.stat-cube {
+    height: 150px;
+    width: 150px;
+    margin: 0 auto;
+    perspective: 600px;
+}
+.cube {
+    width: 100%;
+    height: 100%;
+    position: relative;
+    transform-style: preserve-3d;
+    transform: rotateX(20deg) rotateY(20deg);
+    transition: transform 0.8s ease-out;
+    --cube-color: #0066cc;
+}
+.cube-face {
+    position: absolute;
+    width: 100%;
+    height: 100%;
+    display: flex;
+    flex-direction: column;
+    justify-content: center;
+    align-items: center;
+    background-color: rgba(0, 0, 0, 0.9);
+    border: 2px solid var(--cube-color);
+    backface-visibility: visible;
+    box-sizing: border-box;
+    padding: 10px;
+}
+/* Create all six faces of the cube */
+.cube-face.front {
+    transform: translateZ(75px);
+}
+.cube-face.back {
+    transform: rotateY(180deg) translateZ(75px);
+}
+.cube-face.right {
+    transform: rotateY(90deg) translateZ(75px);
+}
+.cube-face.left {
+    transform: rotateY(-90deg) translateZ(75px);
+}
+.cube-face.top {
+    transform: rotateX(90deg) translateZ(75px);
+}
+.cube-face.bottom {
+    transform: rotateX(-90deg) translateZ(75px);
+}
+/* Add cube edges */
+.cube::after {
+    content: '';
+    position: absolute;
+    width: 100%;
+    height: 100%;
+    border: 2px solid rgba(0, 102, 204, 0.5);
+    box-sizing: border-box;
+    transform: translateZ(-75px);
+}
+/* Add color change animation */
+@keyframes colorPulse {
+    0% { border-color: var(--highlight-color); }
+    50% { border-color: var(--highlight-color); box-shadow: 0 0 15px var(--highlight-color); }
+    100% { border-color: var(--highlight-color); }
+}
+
+/* 360-degree rotation animation */
+@keyframes rotate360 {
+    0% { transform: rotateY(0deg); }
+    100% { transform: rotateY(360deg); }
+}
+
+.rotate360 {
+    animation: rotate360 1.5s ease-in-out;
+}
+
+.color-change .cube-face {
+    animation: colorPulse 1.5s ease-in-out;
+}
+
+/* Hover effect */
+.stat-cube:hover .cube {
+    transform: rotateX(25deg) rotateY(25deg);
+}
+.value {
+    font-size: 24px;
+    font-weight: bold;
+    color: #0066cc;
+    margin-bottom: 5px;
+}
+.label {
+    font-size: 12px;
+    color: #999;
+    text-transform: uppercase;
+}
+.reward-address-title {
+    font-size: 20px;
+    color: #0066cc;
+    margin-bottom: 15px;
+    text-align: center;
+    font-weight: normal;
+    font-family: 'Consolas', 'Courier New', monospace;
+}
+/* Terminal-style command history */
+.terminal-history {
+    background-color: #0c0c0c;
+    border: none;
+    border-radius: 0;
+    font-family: 'Consolas', 'Courier New', monospace;
+    color: #f0f0f0;
+    padding: 10px;
+    position: relative;
+    overflow: hidden;
+}
+.stratum-history-table {
+    width: 100%;
+    border-collapse: collapse;
+    font-size: 12px;
+    background-color: #0c0c0c;
+    border: none;
+}
+.stratum-history-table th, 
+.stratum-history-table td {
+    padding: 6px;
+    text-align: left;
+    border: none;
+}
+.stratum-history-table th {
+    background-color: #1a1a1a;
+    font-size: 13px;
+    color: #0066cc;
+    border: none;
+}
+.stratum-history-table tr {
+    transition: background-color 0.3s;
+    border: none;
+}
+.stratum-history-table tr.miner-command {
+    background-color: #0066cc;
+    color: #000000;
+    font-weight: bold;
+}
+.stratum-history-table tr.pool-command {
+    background-color: #0c0c0c;
+    color: #0066cc;
+}
+.new-row {
+    animation: slideDown 0.5s ease-out;
+}
+@keyframes slideDown {
+    from { transform: translateY(-100%); opacity: 0; }
+    to { transform: translateY(0); opacity: 1; }
+}
+.row-exit {
+    animation: slideDownExit 0.5s ease-out;
+    animation-fill-mode: forwards;
+}
+@keyframes slideDownExit {
+    from { transform: translateY(0); opacity: 1; }
+    to { transform: translateY(100%); opacity: 0; }
+}
+/* Typing effect */
+.typing-effect {
+    position: relative;
+    overflow: hidden;
+    border-right: 0.15em solid #0066cc;
+    white-space: nowrap;
+    animation: typing 0.5s steps(30, end), blink-caret 0.75s step-end infinite;
+}
+
+@keyframes typing {
+    from { width: 0 }
+    to { width: 100% }
+}
+
+@keyframes blink-caret {
+    from, to { border-color: transparent }
+    50% { border-color: #0066cc }
+}
+""".encode('utf-8')
+
+# Script that refreshes the stats page, served separately for the same reason
+_PAGE_JS = """// Function to update cube values and apply appropriate color
+function updateCubeValue(cubeId, newValue) {
+    const cube = document.getElementById(cubeId);
+    if (!cube) return;
+
+    // Get the current value
+    const cubeValue = cube.querySelector('.cube-face.front .value').textContent.trim();
+
+    // Check if the value has changed
+    if (cubeValue !== newValue) {
+        // Use orange color for block height cube, blue for others
+        const color = cubeId === 'block-number-cube' ? '#FF8000' : '#0066cc';
+
+        // Get all cube elements
+        const cubeElement = cube.querySelector('.cube');
+        const allFaces = cube.querySelectorAll('.cube-face');
+
+        // Apply color to all faces and borders
+        allFaces.forEach(face => {
+            face.style.borderColor = color;
+        });
+
+        // Apply color to the cube itself
+        cubeElement.style.setProperty('--cube-color', color);
+
+        // Apply color to the value text
+        const frontValue = cube.querySelector('.cube-face.front .value');
+        const backValue = cube.querySelector('.cube-face.back .value');
+        frontValue.style.color = color;
+        backValue.style.color = color;
+
+        // Apply rotation effect for all cubes
+        const rotateX = Math.random() * 360;
+        const rotateY = Math.random() * 360;
+        const rotateZ = Math.random() * 360;
+
+        // Apply the rotation
+        cubeElement.style.transform = 'rotateX(' + rotateX + 'deg) rotateY(' + rotateY + 'deg) rotateZ(' + rotateZ + 'deg)';
+
+        // Reset the rotation after animation
+        setTimeout(() => {
+            cubeElement.style.transform = 'rotateX(20deg) rotateY(20deg)';
+
+            // Update the value after rotation
+            frontValue.textContent = newValue;
+            backValue.textContent = newValue;
+        }, 800);
+    }
+}
+
+// The back faces mirror the front faces, so they are filled in here
+// rather than sent twice in the page
+document.querySelectorAll('.cube-face.back').forEach(back => {
+    back.innerHTML = back.parentNode.querySelector('.cube-face.front').innerHTML;
+});
+
+// Apply the values sent by the server
+function applyStats(stats) {
+    // Update miner agent only if the new one is known
+    if (stats.miner_agent !== 'Unknown') {
+        document.querySelector('.card h2').firstChild.textContent = 'Miner Agent: ' + stats.miner_agent + ' ';
+    }
+
+    // Update each stat cube if value has changed
+    updateCubeValue('block-number-cube', stats.block_number);
+    updateCubeValue('time-since-share-cube', stats.time_since_last_share);
+    updateCubeValue('valid-shares-cube', stats.valid_shares);
+    updateCubeValue('mining-difficulty-cube', stats.mining_difficulty);
+}
+
+if (window.EventSource) {
+    // Apply the values pushed by the server whenever they change
+    new EventSource('/stream').onmessage = function(event) {
+        applyStats(JSON.parse(event.data));
+    };
+} else {
+    // Poll the page values every 5 seconds
+    setInterval(function() {
+        fetch('/values')
+            .then(response => response.json())
+            .then(applyStats);
+    }, 5000);
+}
+
+// Initialize all cubes with the correct color
+document.addEventListener('DOMContentLoaded', function() {
+    // Get all stat cubes
+    const statCubes = document.querySelectorAll('.stat-cube');
+
+    statCubes.forEach(cube => {
+        const valueElement = cube.querySelector('.cube-face.front .value');
+        if (valueElement) {
+            // Use orange for block height cube, blue for others
+            const color = cube.id === 'block-number-cube' ? '#FF8000' : '#0066cc';
+
+            // Get all cube elements
+            const cubeElement = cube.querySelector('.cube');
+            const allFaces = cube.querySelectorAll('.cube-face');
+
+            // Apply color to all faces and borders
+            allFaces.forEach(face => {
+                face.style.borderColor = color;
+            });
+
+            // Apply color to the cube itself
+            cubeElement.style.setProperty('--cube-color', color);
+
+            // Apply color to the value text
+            const frontValue = cube.querySelector('.cube-face.front .value');
+            const backValue = cube.querySelector('.cube-face.back .value');
+            if (frontValue) frontValue.style.color = color;
+            if (backValue) backValue.style.color = color;
+        }
+    });
+});
+""".encode('utf-8')
+
+def _asset_version(body):
+    """Short content hash used to version and revalidate a static asset"""
+    return hashlib.md5(body).hexdigest()[:12]
+
+# Referenced with the version in the query string so a changed asset is refetched
+_PAGE_CSS_VERSION = _asset_version(_PAGE_CSS)
+_PAGE_JS_VERSION = _asset_version(_PAGE_JS)
+
+# Static parts of the stats page, encoded once at import time
+_PAGE_HEAD = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Mining Dashboard</title>
+    <link rel="stylesheet" href="/pool.css?v={_PAGE_CSS_VERSION}">
+</head>
+<body>
+""".encode('utf-8')
+
+_PAGE_TAIL = f"""    <div class="footer">
+        <!-- Footer content removed -->
+    </div>
+    
+    <script src="/pool.js?v={_PAGE_JS_VERSION}"></script>
+</body>
+</html>
+""".encode('utf-8')
+
+# Markup of the stats page body, filled in by PoolStatsPage.render_GET
+_PAGE_BODY = """    <div class="card">
+        <h2>Miner Agent: {miner_agent} <span class="bitcoin-logo">₿</span></h2>
+    </div>
+    
+    <div class="card">
+        <div class="stats-container">
+            <div class="stat-cube" id="block-number-cube">
+                <div class="cube">
+                    <div class="cube-face front">
+                        <div class="value">{block_number}</div>
+                        <div class="label">Block Number</div>
+                    </div>
+                    <div class="cube-face back"></div>
+                    <div class="cube-face right"></div>
+                    <div class="cube-face left"></div>
+                    <div class="cube-face top"></div>
+                    <div class="cube-face bottom"></div>
+                </div>
+            </div>
+            
+            <div class="stat-cube" id="time-since-share-cube">
+                <div class="cube">
+                    <div class="cube-face front">
+                        <div class="value">{time_since_last_share}</div>
+                        <div class="label">Time Since Share</div>
+                    </div>
+                    <div class="cube-face back"></div>
+                    <div class="cube-face right"></div>
+                    <div class="cube-face left"></div>
+                    <div class="cube-face top"></div>
+                    <div class="cube-face bottom"></div>
+                </div>
+            </div>
+            
+            <div class="stat-cube" id="valid-shares-cube">
+                <div class="cube">
+                    <div class="cube-face front">
+                        <div class="value">{valid_shares}</div>
+                        <div class="label">Valid Shares</div>
+                    </div>
+                    <div class="cube-face back"></div>
+                    <div class="cube-face right"></div>
+                    <div class="cube-face left"></div>
+                    <div class="cube-face top"></div>
+                    <div class="cube-face bottom"></div>
+                </div>
+            </div>
+            
+            <div class="stat-cube" id="mining-difficulty-cube">
+                <div class="cube">
+                    <div class="cube-face front">
+                        <div class="value">{mining_difficulty}</div>
+                        <div class="label">Mining Difficulty</div>
+                    </div>
+                    <div class="cube-face back"></div>
+                    <div class="cube-face right"></div>
+                    <div class="cube-face left"></div>
+                    <div class="cube-face top"></div>
+                    <div class="cube-face bottom"></div>
+                </div>
+            </div>
+        </div>
+    </div>
+    
+    <div class="card">
+        <h2 class="reward-address-title">Reward Address: {full_reward_address}</h2>
+    </div>
+    
+"""
+
+# The page body split into (encoded literal, field name) pairs, so a render
+# only has to encode the values
+_PAGE_BODY_PARTS = [(literal.encode('utf-8'), field)
+                    for literal, field, _, _ in string.Formatter().parse(_PAGE_BODY)]
 
 class JSONStatsResource(resource.Resource):
     """Resource for JSON API access to pool statistics"""
@@ -18,27 +511,43 @@ class JSONStatsResource(resource.Resource):
     def __init__(self, factory):
         resource.Resource.__init__(self)
         self.factory = factory
+        
+        # Last serialized response per (pretty, all) variant, as
+        # (time, body, gzipped body, etag)
+        self._cache = {}
     
     def render_GET(self, request):
         """Render JSON API response"""
         request.setHeader(b"content-type", b"application/json; charset=utf-8")
         
-        # Get pool stats
-        pool_stats = self.factory.stats.get_pool_stats()
+        # Compact by default, indented when requested with ?pretty
+        query = _query_args(request)
+        pretty = b'pretty' in query
+        show_all = b'all' in query
+        key = (pretty, show_all)
         
-        # Get worker stats
-        worker_stats = self.factory.stats.get_worker_stats()
+        # Clients that already have this version of the stats get a 304
+        # without the response being built
+        etag = self._etag(key)
+        if self._not_modified(request, etag):
+            return b""
         
-        # Format worker stats for JSON
-        formatted_workers = {}
-        for worker_name, stats in worker_stats.items():
-            formatted_workers[worker_name] = {
-                'valid_shares': stats.get('shares', {}).get('valid', 0),
-                'invalid_shares': stats.get('shares', {}).get('invalid', 0),
-                'blocks_found': stats.get('blocks_found', 0),
-                'last_share_time': stats.get('last_share_time', 0)
-            }
+        # Serve the cached response if it was built within the TTL
+        now = time.time()
+        cached = self._cache.get(key)
+        if cached is not None and now - cached[0] < API_CACHE_TTL:
+            return self._respond(request, cached)
         
+        # Get pool stats
+        pool_stats = self.factory.stats.get_pool_stats()
+        
+        # Get worker stats, already flattened for JSON; workers that have not
+        # submitted a share yet are left out unless asked for with ?all
+        formatted_workers = self.factory.stats.get_formatted_workers()
+        if not show_all:
+            formatted_workers = {name: worker for name, worker in formatted_workers.items()
+                                 if worker['valid_shares'] or worker['invalid_shares']}
+
         # Build response
         response = {
             'pool': {
@@ -51,10 +560,114 @@ class JSONStatsResource(resource.Resource):
                 'uptime': pool_stats.get('uptime', 0)
             },
             'workers': formatted_workers,
-            'timestamp': int(time.time())
+            'timestamp': int(now)
         }
         
-        return json.dumps(response, indent=4).encode('utf-8')
+        if len(formatted_workers) < THREADED_JSON_MIN_WORKERS:
+            entry = self._cache[key] = (now,) + _encode_response(response, pretty) + (etag,)
+            return self._respond(request, entry)
+        
+        # Large responses are serialized in the thread pool so share handling
+        # on the reactor isn't held up; the response only holds snapshots
+        disconnected = []
+        request.notifyFinish().addErrback(lambda _: disconnected.append(True))
+        
+        def write_response(encoded):
+            entry = self._cache[key] = (now,) + encoded + (etag,)
+            if not disconnected:
+                request.write(self._respond(request, entry))
+                request.finish()
+        
+        def write_error(failure):
+            logging.error(f"Error serializing API response: {failure.getErrorMessage()}")
+            if not disconnected:
+                request.setResponseCode(500)
+                request.finish()
+        
+        deferToThread(_encode_response, response, pretty).addCallbacks(write_response, write_error)
+        return server.NOT_DONE_YET
+    
+    def _etag(self, key):
+        """
+        ETag of the current API response variant
+        
+        key: (pretty, show_all) variant of the response
+        
+        Built from the stats version and the current job rather than the body,
+        since the body's uptime and timestamp change every second.
+        """
+        stats = self.factory.stats
+        pretty, show_all = key
+        return (f'"{int(stats.start_time)}.{stats.version}.{self.factory.latest_job_id}'
+                f'.{int(pretty)}{int(show_all)}"').encode('utf-8')
+    
+    @staticmethod
+    def _not_modified(request, etag):
+        """Set the ETag for the encoding the client gets, and answer 304 if it has it already"""
+        request.setHeader(b"vary", b"accept-encoding")
+        if b"gzip" in (request.getHeader(b"accept-encoding") or b""):
+            etag = etag[:-1] + b'-gzip"'
+        request.setHeader(b"etag", etag)
+        if request.getHeader(b"if-none-match") == etag:
+            request.setResponseCode(304)
+            return True
+        return False
+    
+    def _respond(self, request, entry):
+        """Pick the plain or gzipped body of a cache entry, or nothing if the client has it"""
+        _, body, gzipped, etag = entry
+        if self._not_modified(request, etag):
+            return b""
+        if b"gzip" in (request.getHeader(b"accept-encoding") or b""):
+            request.setHeader(b"content-encoding", b"gzip")
+            return gzipped
+        return body
+
+class CommandHistoryResource(resource.Resource):
+    """JSON list of the most recent stratum commands, newest first"""
+    
+    isLeaf = True
+    
+    def __init__(self, factory):
+        resource.Resource.__init__(self)
+        self.factory = factory
+    
+    def render_GET(self, request):
+        """Render the command history"""
+        request.setHeader(b"content-type", b"application/json; charset=utf-8")
+        
+        # The history is recorded oldest first
+        commands = self.factory.stats.get_stratum_command_history()
+        commands.reverse()
+        return _dumps_json({'commands': commands[:10]})
+
+class StaticResource(resource.Resource):
+    """Static asset for the stats page, cached by browsers and revalidated by ETag"""
+    
+    isLeaf = True
+    
+    def __init__(self, body, content_type):
+        resource.Resource.__init__(self)
+        self.body = body
+        self.content_type = content_type
+        self.version = _asset_version(body).encode('ascii')
+        self.etag = b'"' + self.version + b'"'
+    
+    def render_GET(self, request):
+        """Render the asset, or 304 if the browser already has it"""
+        request.setHeader(b"etag", self.etag)
+        # The page links the asset with its content hash as ?v=, so that URL
+        # never changes content; any other URL is revalidated by ETag
+        if request.args.get(b'v') == [self.version]:
+            request.setHeader(b"cache-control", b"max-age=31536000, immutable")
+        else:
+            request.setHeader(b"cache-control", b"no-cache")
+        if request.getHeader(b"if-none-match") == self.etag:
+            request.setResponseCode(304)
+            return b""
+        
+        request.setHeader(b"content-type", self.content_type)
+        return self.body
 
 class PoolStatsPage(resource.Resource):
     """Pool statistics page"""
@@ -64,228 +677,95 @@ class PoolStatsPage(resource.Resource):
         resource.Resource.__init__(self)
         self.factory = factory
         self.last_difficulty = 1.0
-        self.difficulty_history = []  # Store recent difficulty values
         self.last_miner_agent = "Unknown"  # Store the last known miner agent
         
-    def get_latest_difficulty_from_logs(self):
-        """Extract the latest mining difficulty from log messages"""
-        try:
-            # Define the log file path - adjust as needed
-            log_files = [
-                "mining_pool.log",  # Default log file
-                "/var/log/mining_pool.log",  # System log location
-                os.path.join(os.path.dirname(os.path.abspath(__file__)), "mining_pool.log"),  # Same directory as script
-                os.path.join(os.path.expanduser("~"), "mining_pool.log"),  # User's home directory
-                "/tmp/mining_pool.log",  # Temporary directory
-                "solo_pool.log",  # Alternative name
-                os.path.join(os.path.dirname(os.path.abspath(__file__)), "solo_pool.log"),
-                "logs/mining_pool.log",
-                "logs/solo_pool.log",
-                "../logs/mining_pool.log",
-            ]
-            
-            # Try to find an existing log file
-            log_file = None
-            for file_path in log_files:
-                if os.path.exists(file_path):
-                    log_file = file_path
-                    break
-            
-            if log_file is None:
-                # If no log file found, check if we can access stdout/stderr
-                return None
-                
-            # Patterns to match difficulty in log messages
-            patterns = [
-                r"Sent new difficulty ([0-9.]+) to",
-                r"Halving difficulty from [0-9.]+ to ([0-9.]+)",
-                r"difficulty from [0-9.]+ to ([0-9.]+)",
-                r"new difficulty ([0-9.]+) to",
-                r"difficulty: ([0-9.]+)"
-            ]
-            
-            # Read the last 50 lines of the log file
-            with open(log_file, 'r') as f:
-                # Get file size
-                f.seek(0, 2)
-                file_size = f.tell()
-                
-                # Start from the end and read up to 20KB
-                f.seek(max(0, file_size - 20000), 0)
-                lines = f.readlines()
-                
-                # Take the last 100 lines
-                lines = lines[-100:]
-            
-            # Search for difficulty values in reverse order (newest first)
-            for line in reversed(lines):
-                for pattern in patterns:
-                    match = re.search(pattern, line)
-                    if match:
-                        difficulty = float(match.group(1))
-                        # Add to history
-                        self.difficulty_history.append(difficulty)
-                        if len(self.difficulty_history) > 5:
-                            self.difficulty_history = self.difficulty_history[-5:]
-                        return difficulty
-                    
-            return None
-        except Exception as e:
-            logging.error(f"Error extracting difficulty from logs: {str(e)}")
-            return None
-    
-    def get_difficulty_from_stdout(self):
-        """Try to capture difficulty values from stdout/stderr"""
-        try:
-            # This is a fallback method to get difficulty values
-            # Check if we have any values in history
-            if self.difficulty_history:
-                return self.difficulty_history[-1]
-            return None
-        except Exception as e:
-            logging.error(f"Error getting difficulty from stdout: {str(e)}")
-            return None
+        # Masked form of the reward address, as (address, masked)
+        self._masked_address = (None, "Unknown")
+
+        # Last rendered page body, reused for PAGE_CACHE_TTL seconds
+        self._cache_body = None
+        self._cache_time = 0
     
     def render_GET(self, request):
         """Render the stats page"""
         request.setHeader(b"content-type", b"text/html; charset=utf-8")
         
+        # Send the static head right away so the browser can start on it
+        request.write(_PAGE_HEAD)
+        
+        # Serve the cached body if it was rendered within the last second; the
+        # stats change with nearly every share on a busy pool, so refreshes in
+        # between reuse it rather than waiting for the stats to settle
+        now = time.time()
+        if self._cache_body is not None and now - self._cache_time < PAGE_CACHE_TTL:
+            self._finish_page(request, self._cache_body)
+            return server.NOT_DONE_YET
+        
+        values = self._page_values(now)
+        
+        # Fill in the page body; the head and script are static
+        fields = {
+            'miner_agent': escape(values['miner_agent']).encode('utf-8'),
+            'block_number': str(values['block_number']).encode('utf-8'),
+            'time_since_last_share': str(values['time_since_last_share']).encode('utf-8'),
+            'valid_shares': str(values['valid_shares']).encode('utf-8'),
+            'mining_difficulty': str(values['mining_difficulty']).encode('utf-8'),
+            'full_reward_address': escape(values['full_reward_address']).encode('utf-8')
+        }
+        body_parts = []
+        for literal, field in _PAGE_BODY_PARTS:
+            body_parts.append(literal)
+            if field is not None:
+                body_parts.append(fields[field])
+        body = b"".join(body_parts)
+        
+        self._cache_body = body
+        self._cache_time = now
+        self._finish_page(request, body)
+        return server.NOT_DONE_YET
+    
+    def _page_values(self, now):
+        """Collect the values shown on the stats page"""
         # Get pool stats
         pool_stats = self.factory.stats.get_pool_stats()
         
-        # Get worker stats
-        worker_stats = self.factory.stats.get_worker_stats()
+        # Get worker share counts
+        worker_stats = self.factory.stats.get_formatted_workers()
         
         # Get current job information to extract block number
         block_number = "Unknown"
-        if self.factory.jobs:
-            # Get the latest job
-            job_id = max(self.factory.jobs.keys())
-            job = self.factory.jobs[job_id]
+        job = self.factory.jobs.get(self.factory.latest_job_id)
+        if job:
             block_number = job.get('height', 'Unknown')
         
-        # Get the reward address (last 4 characters)
-        reward_address = "Unknown"
-        full_reward_address = "Unknown"
+        # Get the reward address, masked only when it changes
+        full_reward_address = self._mask_reward_address()
         
-        if hasattr(self.factory, 'pool_address') and self.factory.pool_address:
-            full_address = self.factory.pool_address
-            # Mask the middle characters, keeping first 2 and last 2
-            if len(full_address) > 4:
-                full_reward_address = full_address[:2] + '*' * (len(full_address) - 4) + full_address[-2:]
-            else:
-                full_reward_address = full_address
-            reward_address = full_address[-4:] if len(full_address) >= 4 else full_address
-        elif pool_stats.get('reward_address'):
-            full_address = pool_stats.get('reward_address')
-            # Mask the middle characters, keeping first 2 and last 2
-            if len(full_address) > 4:
-                full_reward_address = full_address[:2] + '*' * (len(full_address) - 4) + full_address[-2:]
-            else:
-                full_reward_address = full_address
-            reward_address = full_address[-4:] if len(full_address) >= 4 else full_address
-        
-        # Get command history
-        command_history = self.factory.stats.get_stratum_command_history()
-        
-        # Sort by timestamp in descending order (newest first)
-        command_history.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        # Limit to 10 most recent commands
-        command_history = command_history[:10]
-        
-        # Format worker stats as HTML table rows
-        worker_rows = ""
-        for worker, stats in worker_stats.items():
-            # Only show workers with 1 or more valid shares
-            if stats.get('shares', {}).get('valid', 0) < 1:
-                continue
-                
-            # Calculate time since last share
-            time_since_last_share = "Never"
-            if stats.get('last_share_time', 0) > 0:
-                seconds_since = time.time() - stats.get('last_share_time', 0)
-                time_since_last_share = f"{int(seconds_since)} seconds"
-                if seconds_since >= 60:
-                    minutes = int(seconds_since / 60)
-                    seconds = int(seconds_since % 60)
-                    time_since_last_share = f"{minutes}m {seconds}s"
-                if seconds_since >= 3600:
-                    hours = int(seconds_since / 3600)
-                    minutes = int((seconds_since % 3600) / 60)
-                    time_since_last_share = f"{hours}h {minutes}m"
-            
-            worker_rows += f"""
-            <tr>
-                <td>{block_number}</td>
-                <td>{time_since_last_share}</td>
-                <td>{stats.get('shares', {}).get('valid', 0)}</td>
-                <td>{reward_address}</td>
-            </tr>
-            """
-        
-        # Format stratum command history
-        command_history_rows = ""
-        # Reverse the command history to show newest first and take 10 commands
-        for cmd in command_history:
-            timestamp = datetime.fromtimestamp(cmd.get('timestamp', 0)).strftime('%H:%M:%S')
-            sender = cmd.get('sender', 'unknown')
-            method = cmd.get('method', 'unknown')
-            params = cmd.get('params', None)
-            
-            # Format parameters as a string, truncate if too long
-            params_str = ""
-            if params:
-                try:
-                    # Special handling for mining.submit to exclude the first parameter (worker name/address)
-                    if method == 'mining.submit' and isinstance(params, list) and len(params) > 1:
-                        # Create a copy of params without the first element
-                        filtered_params = params[1:]
-                        params_str = str(filtered_params)
-                    elif isinstance(params, list) and len(params) > 0:
-                        params_str = str(params)
-                    elif isinstance(params, dict) and len(params) > 0:
-                        params_str = str(params)
-                    
-                    # Truncate if too long
-                    if len(params_str) > 50:
-                        params_str = params_str[:47] + "..."
-                except:
-                    params_str = "Error formatting params"
-            
-            # Determine row class based on sender
-            row_class = "miner-command" if sender == "miner" else "pool-command"
-            
-            command_history_rows += f"""
-            <tr class="{row_class}">
-                <td>{timestamp}</td>
-                <td>{sender}</td>
-                <td>{method}</td>
-                <td>{params_str}</td>
-            </tr>
-            """
+        # Get command history for the miner agent lookup below
+        full_history = self.factory.stats.get_stratum_command_history()
+        
+        # Only show workers with 1 or more valid shares
+        shown_workers = [(worker, stats) for worker, stats in worker_stats.items()
+                         if stats['valid_shares'] >= 1]
+        
+        # The time since share cube follows the most recently added of them
+        time_since_last_share = "N/A"
+        if shown_workers:
+            time_since_last_share = _time_since_share(shown_workers[-1][1]['last_share_time'], now)
         
         # Get the mining difficulty directly from the difficulty adjuster
         try:
             # Get the difficulty directly from the adjuster
             mining_difficulty = 0
             
-            # Try to get the difficulty from the clients dictionary in the adjuster
-            if hasattr(self.factory, 'difficulty_adjuster') and hasattr(self.factory.difficulty_adjuster, 'client_difficulties'):
+            # Try to get the difficulty from the clients known to the adjuster
+            if hasattr(self.factory, 'difficulty_adjuster'):
+                client_difficulties = self.factory.difficulty_adjuster.get_client_difficulties()
                 # Get the first client's difficulty
-                if self.factory.difficulty_adjuster.client_difficulties:
-                    # Get any client ID
-                    client_id = next(iter(self.factory.difficulty_adjuster.client_difficulties))
-                    mining_difficulty = self.factory.difficulty_adjuster.client_difficulties[client_id]
+                if client_difficulties:
+                    mining_difficulty = next(iter(client_difficulties.values()))
             
-            # If that failed, try to get it from the worker stats
-            if mining_difficulty == 0:
-                for worker, stats in worker_stats.items():
-                    if stats.get('active', False):
-                        mining_difficulty = stats.get('difficulty', 1.0)
-                        break
-            
-            # If still no value, use the initial difficulty
+            # If that failed, use the initial difficulty
             if mining_difficulty == 0:
                 mining_difficulty = self.factory.difficulty_adjuster.initial_difficulty
         except Exception as e:
@@ -295,475 +775,142 @@ class PoolStatsPage(resource.Resource):
         # Store this difficulty for future use
         self.last_difficulty = mining_difficulty
         
-        # Get miner agent if available
+        # Get miner agent if available, from the mining.subscribe messages in
+        # the command history (the worker view carries no agent)
         miner_agent = "Unknown"
-        
-        # First check if it's directly in worker stats
-        for worker, stats in worker_stats.items():
-            if stats.get('active', False) and 'agent' in stats:
-                miner_agent = stats.get('agent', 'Unknown')
-                self.last_miner_agent = miner_agent  # Store for future use
-                break
-        
-        # If not found, check command history for mining.subscribe messages
-        if miner_agent == "Unknown":
-            for cmd in self.factory.stats.get_stratum_command_history():
-                if cmd.get('method') == 'mining.subscribe' and cmd.get('sender') == 'miner' and cmd.get('params'):
-                    try:
-                        # The first parameter of mining.subscribe is the miner agent
-                        if isinstance(cmd['params'], list) and len(cmd['params']) > 0:
-                            agent_str = str(cmd['params'][0])
-                            if agent_str and agent_str != "None":
-                                miner_agent = agent_str
-                                self.last_miner_agent = miner_agent  # Store for future use
-                                # If it's a Bitaxe miner, prioritize it
-                                if "bitaxe" in agent_str.lower():
-                                    break
-                    except Exception as e:
-                        logging.error(f"Error extracting miner agent from command history: {str(e)}")
+        for cmd in full_history:
+            if cmd.get('method') == 'mining.subscribe' and cmd.get('sender') == 'miner' and cmd.get('params'):
+                try:
+                    # The first parameter of mining.subscribe is the miner agent
+                    if isinstance(cmd['params'], list) and len(cmd['params']) > 0:
+                        agent_str = str(cmd['params'][0])
+                        if agent_str and agent_str != "None":
+                            miner_agent = agent_str
+                            self.last_miner_agent = miner_agent  # Store for future use
+                            # If it's a Bitaxe miner, prioritize it
+                            if "bitaxe" in agent_str.lower():
+                                break
+                except Exception as e:
+                    logging.error(f"Error extracting miner agent from command history: {str(e)}")
         
         # If still unknown, use the last known agent if available
         if miner_agent == "Unknown" and self.last_miner_agent != "Unknown":
             miner_agent = self.last_miner_agent
             logging.info(f"Using cached miner agent: {miner_agent}")
         
-        # Create HTML directly
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Mining Dashboard</title>
-    <style>
-        body {{
-            background-color: #000000;
-            color: #eee;
-            font-family: 'Courier New', monospace;
-            margin: 0;
-            padding: 20px;
-        }}
-        .card {{
-            background-color: #000000;
-            border-radius: 8px;
-            padding: 20px;
-            margin-bottom: 20px;
-            box-shadow: 0 4px 8px rgba(0, 0, 0, 0.2);
-        }}
-        h1, h2 {{
-            color: #0066cc;
-            text-align: center;
-        }}
-        .bitcoin-logo {{
-            color: #FF8000;
-            font-size: 24px;
-            font-weight: bold;
-            margin-left: 10px;
-        }}
-        .stats-container {{
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            grid-template-rows: 1fr 1fr;
-            gap: 40px;
-            margin: 40px auto;
-            max-width: 500px;
-        }}
-        .stat-cube {{
-            height: 150px;
-            width: 150px;
-            margin: 0 auto;
-            perspective: 600px;
-        }}
-        .cube {{
-            width: 100%;
-            height: 100%;
-            position: relative;
-            transform-style: preserve-3d;
-            transform: rotateX(20deg) rotateY(20deg);
-            transition: transform 0.8s ease-out;
-            --cube-color: #0066cc;
-        }}
-        .cube-face {{
-            position: absolute;
-            width: 100%;
-            height: 100%;
-            display: flex;
-            flex-direction: column;
-            justify-content: center;
-            align-items: center;
-            background-color: rgba(0, 0, 0, 0.9);
-            border: 2px solid var(--cube-color);
-            backface-visibility: visible;
-            box-sizing: border-box;
-            padding: 10px;
-        }}
-        /* Create all six faces of the cube */
-        .cube-face.front {{
-            transform: translateZ(75px);
-        }}
-        .cube-face.back {{
-            transform: rotateY(180deg) translateZ(75px);
-        }}
-        .cube-face.right {{
-            transform: rotateY(90deg) translateZ(75px);
-        }}
-        .cube-face.left {{
-            transform: rotateY(-90deg) translateZ(75px);
-        }}
-        .cube-face.top {{
-            transform: rotateX(90deg) translateZ(75px);
-        }}
-        .cube-face.bottom {{
-            transform: rotateX(-90deg) translateZ(75px);
-        }}
-        /* Add cube edges */
-        .cube::after {{
-            content: '';
-            position: absolute;
-            width: 100%;
-            height: 100%;
-            border: 2px solid rgba(0, 102, 204, 0.5);
-            box-sizing: border-box;
-            transform: translateZ(-75px);
-        }}
-        /* Add color change animation */
-        @keyframes colorPulse {{
-            0% {{ border-color: var(--highlight-color); }}
-            50% {{ border-color: var(--highlight-color); box-shadow: 0 0 15px var(--highlight-color); }}
-            100% {{ border-color: var(--highlight-color); }}
-        }}
-        
-        /* 360-degree rotation animation */
-        @keyframes rotate360 {{
-            0% {{ transform: rotateY(0deg); }}
-            100% {{ transform: rotateY(360deg); }}
-        }}
-        
-        .rotate360 {{
-            animation: rotate360 1.5s ease-in-out;
-        }}
-        
-        .color-change .cube-face {{
-            animation: colorPulse 1.5s ease-in-out;
-        }}
-        
-        /* Hover effect */
-        .stat-cube:hover .cube {{
-            transform: rotateX(25deg) rotateY(25deg);
-        }}
-        .value {{
-            font-size: 24px;
-            font-weight: bold;
-            color: #0066cc;
-            margin-bottom: 5px;
-        }}
-        .label {{
-            font-size: 12px;
-            color: #999;
-            text-transform: uppercase;
-        }}
-        .reward-address-title {{
-            font-size: 20px;
-            color: #0066cc;
-            margin-bottom: 15px;
-            text-align: center;
-            font-weight: normal;
-            font-family: 'Consolas', 'Courier New', monospace;
-        }}
-        /* Terminal-style command history */
-        .terminal-history {{
-            background-color: #0c0c0c;
-            border: none;
-            border-radius: 0;
-            font-family: 'Consolas', 'Courier New', monospace;
-            color: #f0f0f0;
-            padding: 10px;
-            position: relative;
-            overflow: hidden;
-        }}
-        .stratum-history-table {{
-            width: 100%;
-            border-collapse: collapse;
-            font-size: 12px;
-            background-color: #0c0c0c;
-            border: none;
-        }}
-        .stratum-history-table th, 
-        .stratum-history-table td {{
-            padding: 6px;
-            text-align: left;
-            border: none;
-        }}
-        .stratum-history-table th {{
-            background-color: #1a1a1a;
-            font-size: 13px;
-            color: #0066cc;
-            border: none;
-        }}
-        .stratum-history-table tr {{
-            transition: background-color 0.3s;
-            border: none;
-        }}
-        .stratum-history-table tr.miner-command {{
-            background-color: #0066cc;
-            color: #000000;
-            font-weight: bold;
-        }}
-        .stratum-history-table tr.pool-command {{
-            background-color: #0c0c0c;
-            color: #0066cc;
-        }}
-        .new-row {{
-            animation: slideDown 0.5s ease-out;
-        }}
-        @keyframes slideDown {{
-            from {{ transform: translateY(-100%); opacity: 0; }}
-            to {{ transform: translateY(0); opacity: 1; }}
-        }}
-        .row-exit {{
-            animation: slideDownExit 0.5s ease-out;
-            animation-fill-mode: forwards;
-        }}
-        @keyframes slideDownExit {{
-            from {{ transform: translateY(0); opacity: 1; }}
-            to {{ transform: translateY(100%); opacity: 0; }}
-        }}
-        /* Typing effect */
-        .typing-effect {{
-            position: relative;
-            overflow: hidden;
-            border-right: 0.15em solid #0066cc;
-            white-space: nowrap;
-            animation: typing 0.5s steps(30, end), blink-caret 0.75s step-end infinite;
-        }}
-        
-        @keyframes typing {{
-            from {{ width: 0 }}
-            to {{ width: 100% }}
-        }}
-        
-        @keyframes blink-caret {{
-            from, to {{ border-color: transparent }}
-            50% {{ border-color: #0066cc }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="card">
-        <h2>Miner Agent: {miner_agent} <span class="bitcoin-logo">₿</span></h2>
-    </div>
+        if worker_stats:
+            # Valid shares of the most recently added worker
+            valid_shares = next(reversed(worker_stats.values()))['valid_shares']
+        else:
+            valid_shares = pool_stats.get('valid_shares', 0)
+        
+        return {
+            'miner_agent': miner_agent,
+            'block_number': block_number,
+            'time_since_last_share': time_since_last_share,
+            'valid_shares': valid_shares,
+            'mining_difficulty': mining_difficulty,
+            'full_reward_address': full_reward_address
+        }
     
-    <div class="card">
-        <div class="stats-container">
-            <div class="stat-cube" id="block-number-cube">
-                <div class="cube">
-                    <div class="cube-face front">
-                        <div class="value">{block_number}</div>
-                        <div class="label">Block Number</div>
-                    </div>
-                    <div class="cube-face back">
-                        <div class="value">{block_number}</div>
-                        <div class="label">Block Number</div>
-                    </div>
-                    <div class="cube-face right"></div>
-                    <div class="cube-face left"></div>
-                    <div class="cube-face top"></div>
-                    <div class="cube-face bottom"></div>
-                </div>
-            </div>
-            
-            <div class="stat-cube" id="time-since-share-cube">
-                <div class="cube">
-                    <div class="cube-face front">
-                        <div class="value">{time_since_last_share if 'time_since_last_share' in locals() else 'N/A'}</div>
-                        <div class="label">Time Since Share</div>
-                    </div>
-                    <div class="cube-face back">
-                        <div class="value">{time_since_last_share if 'time_since_last_share' in locals() else 'N/A'}</div>
-                        <div class="label">Time Since Share</div>
-                    </div>
-                    <div class="cube-face right"></div>
-                    <div class="cube-face left"></div>
-                    <div class="cube-face top"></div>
-                    <div class="cube-face bottom"></div>
-                </div>
-            </div>
-            
-            <div class="stat-cube" id="valid-shares-cube">
-                <div class="cube">
-                    <div class="cube-face front">
-                        <div class="value">{stats.get('shares', {}).get('valid', 0) if 'stats' in locals() else pool_stats.get('valid_shares', 0)}</div>
-                        <div class="label">Valid Shares</div>
-                    </div>
-                    <div class="cube-face back">
-                        <div class="value">{stats.get('shares', {}).get('valid', 0) if 'stats' in locals() else pool_stats.get('valid_shares', 0)}</div>
-                        <div class="label">Valid Shares</div>
-                    </div>
-                    <div class="cube-face right"></div>
-                    <div class="cube-face left"></div>
-                    <div class="cube-face top"></div>
-                    <div class="cube-face bottom"></div>
-                </div>
-            </div>
-            
-            <div class="stat-cube" id="mining-difficulty-cube">
-                <div class="cube">
-                    <div class="cube-face front">
-                        <div class="value">{mining_difficulty}</div>
-                        <div class="label">Mining Difficulty</div>
-                    </div>
-                    <div class="cube-face back">
-                        <div class="value">{mining_difficulty}</div>
-                        <div class="label">Mining Difficulty</div>
-                    </div>
-                    <div class="cube-face right"></div>
-                    <div class="cube-face left"></div>
-                    <div class="cube-face top"></div>
-                    <div class="cube-face bottom"></div>
-                </div>
-            </div>
-        </div>
-    </div>
+    def _mask_reward_address(self):
+        """
+        Get the masked form of the pool's reward address
+        
+        It keeps the first 2 and last 2 characters, and is cached until the factory's address changes.
+        """
+        full_address = getattr(self.factory, 'pool_address', None)
+        if full_address != self._masked_address[0]:
+            if not full_address:
+                masked = (full_address, "Unknown")
+            elif len(full_address) > 4:
+                masked = (full_address, full_address[:2] + '*' * (len(full_address) - 4) + full_address[-2:])
+            else:
+                masked = (full_address, full_address)
+            self._masked_address = masked
+        return self._masked_address[1]
     
-    <div class="card">
-        <h2 class="reward-address-title">Reward Address: {full_reward_address}</h2>
-    </div>
+    def values_json(self, now):
+        """Get the page values as JSON, for the page script to apply"""
+        # Send strings so they compare equal to the text rendered in the page
+        return _dumps_json({k: str(v) for k, v in self._page_values(now).items()})
     
-    <div class="footer">
-        <!-- Footer content removed -->
-    </div>
+    @staticmethod
+    def _finish_page(request, body):
+        """Write the page body and static tail, then finish the response"""
+        request.write(body)
+        request.write(_PAGE_TAIL)
+        request.finish()
+
+class PageValuesResource(resource.Resource):
+    """The values shown on the stats page as JSON, polled by browsers without event streams"""
     
-    <script>
-        // Function to update cube values and apply appropriate color
-        function updateCubeValue(cubeId, newValue) {{
-            const cube = document.getElementById(cubeId);
-            if (!cube) return;
-            
-            // Get the current value
-            const cubeValue = cube.querySelector('.cube-face.front .value').textContent.trim();
-            
-            // Check if the value has changed
-            if (cubeValue !== newValue) {{
-                // Use orange color for block height cube, blue for others
-                const color = cubeId === 'block-number-cube' ? '#FF8000' : '#0066cc';
-                
-                // Get all cube elements
-                const cubeElement = cube.querySelector('.cube');
-                const allFaces = cube.querySelectorAll('.cube-face');
-                
-                // Apply color to all faces and borders
-                allFaces.forEach(face => {{
-                    face.style.borderColor = color;
-                }});
-                
-                // Apply color to the cube itself
-                cubeElement.style.setProperty('--cube-color', color);
-                
-                // Apply color to the value text
-                const frontValue = cube.querySelector('.cube-face.front .value');
-                const backValue = cube.querySelector('.cube-face.back .value');
-                frontValue.style.color = color;
-                backValue.style.color = color;
-                
-                // Apply rotation effect for all cubes
-                const rotateX = Math.random() * 360;
-                const rotateY = Math.random() * 360;
-                const rotateZ = Math.random() * 360;
-                
-                // Apply the rotation
-                cubeElement.style.transform = 'rotateX(' + rotateX + 'deg) rotateY(' + rotateY + 'deg) rotateZ(' + rotateZ + 'deg)';
-                
-                // Reset the rotation after animation
-                setTimeout(() => {{
-                    cubeElement.style.transform = 'rotateX(20deg) rotateY(20deg)';
-                    
-                    // Update the value after rotation
-                    frontValue.textContent = newValue;
-                    backValue.textContent = newValue;
-                }}, 800);
-            }}
-        }}
-        
-        // Auto-refresh every 5 seconds
-        setInterval(function() {{
-            fetch(window.location.href)
-                .then(response => response.text())
-                .then(html => {{
-                    // Parse the HTML
-                    const parser = new DOMParser();
-                    const doc = parser.parseFromString(html, 'text/html');
-                    
-                    // Update miner agent if it's not "Unknown"
-                    const newAgentText = doc.querySelector('.card h2').textContent;
-                    const currentAgentText = document.querySelector('.card h2').textContent;
-                    
-                    if (newAgentText.includes('Miner Agent: Unknown') && !currentAgentText.includes('Miner Agent: Unknown')) {{
-                        // Keep the current agent if the new one is Unknown
-                        console.log("Keeping current agent value");
-                    }} else if (!newAgentText.includes('Miner Agent: Unknown')) {{
-                        // Update only if the new agent is not Unknown
-                        document.querySelector('.card h2').innerHTML = doc.querySelector('.card h2').innerHTML;
-                    }}
-                    
-                    // Update each stat cube if value has changed
-                    updateCubeValue('block-number-cube', doc.getElementById('block-number-cube').querySelector('.cube-face.front .value').textContent.trim());
-                    updateCubeValue('time-since-share-cube', doc.getElementById('time-since-share-cube').querySelector('.cube-face.front .value').textContent.trim());
-                    updateCubeValue('valid-shares-cube', doc.getElementById('valid-shares-cube').querySelector('.cube-face.front .value').textContent.trim());
-                    updateCubeValue('mining-difficulty-cube', doc.getElementById('mining-difficulty-cube').querySelector('.cube-face.front .value').textContent.trim());
-                }});
-        }}, 5000);
-        
-        // Initialize all cubes with the correct color
-        document.addEventListener('DOMContentLoaded', function() {{
-            // Get all stat cubes
-            const statCubes = document.querySelectorAll('.stat-cube');
-            
-            statCubes.forEach(cube => {{
-                const valueElement = cube.querySelector('.cube-face.front .value');
-                if (valueElement) {{
-                    // Use orange for block height cube, blue for others
-                    const color = cube.id === 'block-number-cube' ? '#FF8000' : '#0066cc';
-                    
-                    // Get all cube elements
-                    const cubeElement = cube.querySelector('.cube');
-                    const allFaces = cube.querySelectorAll('.cube-face');
-                    
-                    // Apply color to all faces and borders
-                    allFaces.forEach(face => {{
-                        face.style.borderColor = color;
-                    }});
-                    
-                    // Apply color to the cube itself
-                    cubeElement.style.setProperty('--cube-color', color);
-                    
-                    // Apply color to the value text
-                    const frontValue = cube.querySelector('.cube-face.front .value');
-                    const backValue = cube.querySelector('.cube-face.back .value');
-                    if (frontValue) frontValue.style.color = color;
-                    if (backValue) backValue.style.color = color;
-                }}
-            }});
-        }});
-    </script>
-</body>
-</html>
-"""
+    isLeaf = True
+    
+    def __init__(self, page):
+        resource.Resource.__init__(self)
+        self.page = page
+    
+    def render_GET(self, request):
+        """Render the current page values"""
+        request.setHeader(b"content-type", b"application/json; charset=utf-8")
+        request.setHeader(b"cache-control", b"no-cache")
+        return self.page.values_json(time.time())
+
+class StatsStreamResource(resource.Resource):
+    """Server-sent event stream of the values shown on the stats page"""
+    
+    isLeaf = True
+    
+    def __init__(self, page):
+        resource.Resource.__init__(self)
+        self.page = page
+        self.listeners = set()
+        self.last_event = None
+    
+    def render_GET(self, request):
+        """Open an event stream and send the current values"""
+        request.setHeader(b"content-type", b"text/event-stream")
+        request.setHeader(b"cache-control", b"no-cache")
         
-        return html.encode('utf-8')
+        self.listeners.add(request)
+        request.notifyFinish().addBoth(lambda _: self.listeners.discard(request))
+        
+        request.write(self.last_event or self._build_event())
+        return server.NOT_DONE_YET
+    
+    def _build_event(self):
+        """Build an event from the current page values"""
+        return b"data: " + self.page.values_json(time.time()) + b"\n\n"
+    
+    def push(self):
+        """Send the current values to every listener if they changed"""
+        if not self.listeners:
+            self.last_event = None
+            return
+        
+        event = self._build_event()
+        if event == self.last_event:
+            return
+        self.last_event = event
+        
+        for request in list(self.listeners):
+            request.write(event)
+
+class QuietSite(server.Site):
+    """Site that skips the per-request access log"""
+    
+    def log(self, request):
+        """The stats page is polled constantly, so requests are not logged"""
+        pass
 
+@functools.lru_cache(maxsize=1024)
 def bits_to_difficulty(bits):
     """Convert bits to difficulty"""
     if not bits:
         return "Unknown"
     try:
-        # Convert bits to target
-        exp = bits >> 24
-        mant = bits & 0xFFFFFF
-        target = mant * (2 ** (8 * (exp - 3)))
-        
-        # Calculate difficulty
-        diff1 = 0x00000000FFFF0000000000000000000000000000000000000000000000000000
-        difficulty = diff1 / target
-        return f"{difficulty:.2f}"
+        return f"{get_difficulty(bits):.2f}"
     except Exception:
         return "Unknown"
 
@@ -772,14 +919,36 @@ def setup_web_interface(factory, port=8080):
     # Create root resource
     root = resource.Resource()
     
+    # The page is gzipped for clients that accept it (the API compresses its
+    # cached responses itself); the event stream is left alone so events are
+    # not held back in the compressor
+    gzip_encoders = [server.GzipEncoderFactory()]
+    
     # Add HTML stats page
-    root.putChild(b'', PoolStatsPage(factory))
+    stats_page = PoolStatsPage(factory)
+    root.putChild(b'', resource.EncodingResourceWrapper(stats_page, gzip_encoders))
+
+    # Add the event stream that keeps open stats pages up to date
+    stats_stream = StatsStreamResource(stats_page)
+    root.putChild(b'stream', stats_stream)
+    root.putChild(b'values', PageValuesResource(stats_page))
     
     # Add JSON API endpoint
     root.putChild(b'api', JSONStatsResource(factory))
     
+    # Add the stratum command history on its own, for clients that only poll that
+    root.putChild(b'command_history', CommandHistoryResource(factory))
+
+    # Add the stylesheet and script for the stats page
+    root.putChild(b'pool.css', StaticResource(_PAGE_CSS, b"text/css; charset=utf-8"))
+    root.putChild(b'pool.js', StaticResource(_PAGE_JS, b"application/javascript; charset=utf-8"))
+    
     # Create and start the web server
-    site = server.Site(root)
+    site = QuietSite(root, logPath=None)
     reactor.listenTCP(port, site)
     
+    # Push changed page values to open stats pages every 5 seconds
+    stream_pusher = task.LoopingCall(stats_stream.push)
+    stream_pusher.start(5, now=False)
+    
     return f"http://localhost:{port}"
@@ -6,14 +6,16 @@ import sys
 import logging
 import argparse
 import configparser
-import signal
 
 from twisted.internet import reactor
 from twisted.internet.endpoints import TCP4ServerEndpoint
 
 from bitcoin_rpc import BitcoinRPC
 from stratum import StratumFactory
-from simple_web_interface import setup_web_interface
+
+# Accept queue length for the Stratum listener, so bursts of miner
+# reconnects are not dropped
+LISTEN_BACKLOG = 2048
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Bitcoin Solo Mining Pool')
@@ -26,6 +28,8 @@ def parse_args():
     parser.add_argument('--verbose', dest='verbose', action='store_true', help='Enable verbose logging')
     parser.add_argument('--web', dest='web_stats', action='store_true', help='Enable web statistics on port 8080')
     parser.add_argument('--web-port', dest='web_port', type=int, default=8080, help='Port for web statistics (default: 8080)')
+    parser.add_argument('--template-interval-ms', dest='template_interval_ms', type=int, default=30000, help='Milliseconds between block template refreshes (default: 30000)')
+    parser.add_argument('--cpu', dest='cpu', type=int, help='Pin the pool process to this CPU core')
     return parser.parse_args()
 
 def load_config(config_path):
@@ -40,18 +44,6 @@ def load_config(config_path):
     except configparser.Error as e:
         raise ValueError(f"Error parsing config file: {str(e)}")
 
-def validate_address(bitcoin_rpc, address):
-    """Validate the Bitcoin address"""
-    if not address:
-        return False
-    
-    try:
-        result = bitcoin_rpc.validate_address(address)
-        return result.get('isvalid', False)
-    except Exception as e:
-        logging.error(f"Error validating address: {str(e)}")
-        return False
-
 def main():
     args = parse_args()
     
@@ -62,6 +54,14 @@ def main():
         level=log_level
     )
     
+    # Keep the event loop on one core so its caches stay warm
+    if args.cpu is not None:
+        try:
+            os.sched_setaffinity(0, {args.cpu})
+            logging.info(f"Pinned to CPU {args.cpu}")
+        except (AttributeError, OSError) as e:
+            logging.warning(f"Could not pin to CPU {args.cpu}: {str(e)}")
+    
     # Load config
     try:
         config = load_config(args.config)
@@ -69,13 +69,23 @@ def main():
         logging.error(str(e))
         return 1
     
+    # Get mining address from args or config
+    pool_address = args.address or config.get('pool', 'address', fallback=None)
+    
+    if not pool_address:
+        logging.error(f"Invalid Bitcoin address: {pool_address}")
+        return 1
+    
     # Connect to Bitcoin Core
     try:
         logging.info("Connecting to Bitcoin node...")
-        bitcoin_rpc = BitcoinRPC(args.config)
+        bitcoin_rpc = BitcoinRPC(args.config, config=config)
         
-        # Test connection
-        info = bitcoin_rpc.get_blockchain_info()
+        # Test connection and validate the address in a single round trip
+        info, address_info = bitcoin_rpc.batch([
+            ('getblockchaininfo', []),
+            ('validateaddress', [pool_address])
+        ])
         logging.info(f"Connected to Bitcoin node, chain: {info.get('chain', 'unknown')}")
         
         # Get current block height
@@ -85,22 +95,15 @@ def main():
         logging.error(f"Failed to connect to Bitcoin node: {str(e)}")
         return 1
     
-    # Get mining address from args or config
-    pool_address = args.address
-    if not pool_address and config.has_option('pool', 'address'):
-        pool_address = config.get('pool', 'address')
-    
     # Validate address
-    if not validate_address(bitcoin_rpc, pool_address):
+    if not address_info.get('isvalid', False):
         logging.error(f"Invalid Bitcoin address: {pool_address}")
         return 1
     
     # Set up Stratum server
     try:
         # Get coinbase message
-        coinbase_msg = args.coinbase_msg
-        if not coinbase_msg and config.has_option('pool', 'coinbase_message'):
-            coinbase_msg = config.get('pool', 'coinbase_message')
+        coinbase_msg = args.coinbase_msg or config.get('pool', 'coinbase_message', fallback='')
         
         # Get initial difficulty
         difficulty = args.difficulty
@@ -108,33 +111,33 @@ def main():
             difficulty = config.getfloat('pool', 'difficulty', fallback=0.01)
         
         # Create factory with the specified difficulty
-        factory = StratumFactory(bitcoin_rpc, pool_address, initial_difficulty=difficulty)
+        factory = StratumFactory(bitcoin_rpc, pool_address, initial_difficulty=difficulty,
+                                 template_interval=args.template_interval_ms / 1000)
         factory.coinbase_message = coinbase_msg.encode()
         
         # Set up the Stratum server
         port = args.port
         host = args.host
-        endpoint = TCP4ServerEndpoint(reactor, port, interface=host)
+        endpoint = TCP4ServerEndpoint(reactor, port, backlog=LISTEN_BACKLOG, interface=host)
         endpoint.listen(factory)
         
         logging.info(f"Solo mining pool started on {host}:{port}")
         logging.info(f"Mining rewards will be sent to: {pool_address}")
         logging.info(f"Coinbase message: {coinbase_msg}")
         logging.info(f"Initial difficulty: {difficulty}")
+        logging.info(f"Block template refresh interval: {args.template_interval_ms} ms")
         logging.info("Press Ctrl+C to stop the pool")
         
         # Set up web statistics if enabled
         if args.web_stats:
+            # Imported here so runs without --web skip loading twisted.web
+            from simple_web_interface import setup_web_interface
             web_url = setup_web_interface(factory, port=args.web_port)
             logging.info(f"Web statistics available at {web_url}")
         
-        # Set up signal handling for graceful shutdown
-        def signal_handler(sig, frame):
-            logging.info("Shutting down mining pool...")
-            reactor.stop()
-        
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        # The reactor stops itself on SIGINT/SIGTERM; just log the shutdown
+        reactor.addSystemEventTrigger('before', 'shutdown',
+                                      lambda: logging.info("Shutting down mining pool..."))
         
         # Start the event loop
         reactor.run()
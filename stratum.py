@@ -3,26 +3,38 @@
 
 import json
 import time
-import hashlib
-import binascii
+import functools
 import struct
 import logging
 import random
 import traceback
-import uuid
-from twisted.internet import reactor, defer
+from collections import OrderedDict
+from twisted.internet import reactor, defer, task
 from twisted.internet.protocol import Protocol, Factory
 from twisted.internet.endpoints import TCP4ServerEndpoint
+from twisted.internet.threads import deferToThread
 
 from pool_stats import PoolStats
+from mining_utils import DIFF1_TARGET, _sha256, bits_to_target, double_sha256, hash_block_header
 from difficulty_adjuster import DifficultyAdjuster
 
+try:
+    import orjson
+except ImportError:  # Optional, falls back to the stdlib encoder
+    orjson = None
+
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
 logger = logging.getLogger(__name__)
 
+# Precompiled little-endian integer packers for transaction and header fields
+_UINT8 = struct.Struct('<B')
+_UINT16 = struct.Struct('<H')
+_UINT32 = struct.Struct('<I')
+_UINT64 = struct.Struct('<Q')
+
 class StratumProtocol(Protocol):
     """Stratum protocol implementation"""
     
@@ -46,6 +58,10 @@ class StratumProtocol(Protocol):
         logger.info(f"New connection from {self.client_id}")
         self.extranonce1 = self.factory.get_new_extranonce1()
         
+        # Stratum messages are small and latency sensitive, so don't let
+        # Nagle's algorithm hold them back
+        self.transport.setTcpNoDelay(True)
+        
     def connectionLost(self, reason):
         """Called when the connection is lost"""
         logger.info(f"Connection lost from {self.client_id}: {reason.getErrorMessage()}")
@@ -60,13 +76,18 @@ class StratumProtocol(Protocol):
     def dataReceived(self, data):
         """Process data received from the client"""
         self.buffer += data
+        if b'\n' not in data:
+            return
+        
+        # Split off every complete line at once; the last part is an unfinished line
+        lines = self.buffer.split(b'\n')
+        self.buffer = lines.pop()
         
-        while b'\n' in self.buffer:
-            line, self.buffer = self.buffer.split(b'\n', 1)
+        for line in lines:
             try:
                 line = line.strip()
                 if line:
-                    message = json.loads(line.decode('utf-8'))
+                    message = loads_json(line)
                     self.handle_message(message)
             except json.JSONDecodeError:
                 logger.error(f"Invalid JSON from {self.client_id}: {line}")
@@ -84,30 +105,16 @@ class StratumProtocol(Protocol):
         params = message.get('params', [])
         message_id = message.get('id', None)
         
-        logger.debug(f"Received method: {method}, params: {params}, id: {message_id}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Received method: {method}, params: {params}, id: {message_id}")
         
         # Record the method name from miner to pool
         self.factory.stats.record_miner_to_pool_method(method, params)
         
         try:
-            if method == 'mining.subscribe':
-                self.handle_subscribe(message_id, params)
-            elif method == 'mining.authorize':
-                self.handle_authorize(message_id, params)
-            elif method == 'mining.submit':
-                self.handle_submit(message_id, params)
-            elif method == 'mining.get_transactions':
-                self.handle_get_transactions(message_id)
-            elif method == 'mining.configure':
-                self.handle_configure(message_id, params)
-            elif method == 'mining.suggest_difficulty':
-                self.handle_suggest_difficulty(message_id, params)
-            elif method == 'mining.suggest_target':
-                self.handle_suggest_target(message_id, params)
-            elif method == 'mining.extranonce.subscribe':
-                self.handle_extranonce_subscribe(message_id)
-            elif method == 'mining.multi_version':
-                self.handle_multi_version(message_id, params)
+            handler = self._HANDLERS.get(method)
+            if handler is not None:
+                handler(self, message_id, params)
             else:
                 logger.warning(f"Unknown method from {self.client_id}: {method}")
                 if message_id is not None:
@@ -122,7 +129,7 @@ class StratumProtocol(Protocol):
         """Handle mining.subscribe method"""
         try:
             # Generate a unique subscription ID
-            self.subscription_id = str(uuid.uuid4())
+            self.subscription_id = self.factory.get_new_subscription_id()
             
             # Generate a unique extranonce1
             self.extranonce1 = self.factory.get_new_extranonce1()
@@ -182,6 +189,7 @@ class StratumProtocol(Protocol):
         # In a solo mining pool, we accept any credentials
         self.authorized = True
         self.worker_name = username
+        self.factory.authorize_client(self)
         
         logger.info(f"Authorized worker: {username} from {self.client_id}")
         self.send_result(message_id, True)
@@ -202,7 +210,8 @@ class StratumProtocol(Protocol):
         time_hex = params[3]
         nonce_hex = params[4]
         
-        logger.debug(f"Share submission from {worker_name}: job_id={job_id}, extranonce2={extranonce2}, time={time_hex}, nonce={nonce_hex}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Share submission from {worker_name}: job_id={job_id}, extranonce2={extranonce2}, time={time_hex}, nonce={nonce_hex}")
         
         # Record share time for difficulty adjustment
         changed, new_diff = self.factory.difficulty_adjuster.record_share(self.client_id)
@@ -220,7 +229,7 @@ class StratumProtocol(Protocol):
         # Send success response to client
         self.send_result(message_id, True)
     
-    def handle_get_transactions(self, message_id):
+    def handle_get_transactions(self, message_id, params=None):
         """Handle mining.get_transactions method"""
         # For simplicity, we don't implement this
         self.send_result(message_id, [])
@@ -285,7 +294,7 @@ class StratumProtocol(Protocol):
         
         self.send_result(message_id, True)
     
-    def handle_extranonce_subscribe(self, message_id):
+    def handle_extranonce_subscribe(self, message_id, params=None):
         """Handle mining.extranonce.subscribe method"""
         # This indicates the client wants to be notified of extranonce changes
         logger.info(f"Client {self.client_id} subscribed to extranonce changes")
@@ -308,6 +317,19 @@ class StratumProtocol(Protocol):
         else:
             self.send_result(message_id, False)
     
+    # Handler for each supported Stratum method, called as handler(self, message_id, params)
+    _HANDLERS = {
+        'mining.subscribe': handle_subscribe,
+        'mining.authorize': handle_authorize,
+        'mining.submit': handle_submit,
+        'mining.get_transactions': handle_get_transactions,
+        'mining.configure': handle_configure,
+        'mining.suggest_difficulty': handle_suggest_difficulty,
+        'mining.suggest_target': handle_suggest_target,
+        'mining.extranonce.subscribe': handle_extranonce_subscribe,
+        'mining.multi_version': handle_multi_version
+    }
+    
     def send_result(self, message_id, result):
         """Send a JSON-RPC result to the client"""
         if message_id is None:
@@ -350,8 +372,7 @@ class StratumProtocol(Protocol):
     def send_json(self, obj):
         """Send a JSON object to the client"""
         try:
-            message = json.dumps(obj) + '\n'
-            self.transport.write(message.encode())
+            self.transport.write(dumps_json_line(obj))
         except Exception as e:
             logger.error(f"Error sending JSON to {self.client_id}: {str(e)}")
     
@@ -362,10 +383,8 @@ class StratumProtocol(Protocol):
         
         # Update the worker's difficulty in pool stats
         if self.worker_name and hasattr(self.factory, 'stats'):
-            with self.factory.stats.lock:
-                if self.worker_name in self.factory.stats.clients:
-                    self.factory.stats.clients[self.worker_name]['difficulty'] = difficulty
-                    logger.debug(f"Updated difficulty for {self.worker_name} to {difficulty} in pool stats")
+            if self.factory.stats.set_worker_difficulty(self.worker_name, difficulty):
+                logger.debug(f"Updated difficulty for {self.worker_name} to {difficulty} in pool stats")
     
     def send_job(self, job_id, prev_hash, coinbase1, coinbase2, merkle_branches, version, bits, time, clean_jobs):
         """Send mining.notify notification"""
@@ -387,7 +406,8 @@ class StratumProtocol(Protocol):
         
         # Send notification
         self.send_notification("mining.notify", params)
-        logger.debug(f"Sent job {job_id} to client {self.client_id}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Sent job {job_id} to client {self.client_id}")
 
 
 class StratumFactory(Factory):
@@ -397,13 +417,23 @@ class StratumFactory(Factory):
     
     protocol = StratumProtocol
     
-    def __init__(self, bitcoin_rpc, pool_address, initial_difficulty=1):
+    def __init__(self, bitcoin_rpc, pool_address, initial_difficulty=1, template_interval=30):
+        """
+        Initialize the Stratum factory
+        
+        template_interval: Seconds between block template refreshes from the node
+        """
         self.bitcoin_rpc = bitcoin_rpc
         self.pool_address = pool_address
+        self.template_interval = template_interval
         self.clients = {}
-        self.jobs = {}
+        self.authorized_clients = set()  # Subscribed clients that have also authorized, the broadcast targets
+        self.jobs = OrderedDict()  # Maps job_id to job details, oldest first
         self.current_jobs = {}  # Maps job_id to job details
+        self.latest_job_id = None  # ID of the most recently created job
+        self._coinbase_midstates = {}  # Maps job_id to the SHA-256 state of the coinbase before the extranonce
         self.extranonce1_counter = 0
+        self.subscription_counter = 0
         self.job_counter = 0
         self.coinbase_message = b"Python Solo Mining Pool"
         
@@ -424,11 +454,19 @@ class StratumFactory(Factory):
         self.update_block_template()
         
         # Schedule periodic updates
-        reactor.callLater(30, self.periodic_update)
+        reactor.callLater(self.template_interval, self.periodic_update)
         
         # Schedule periodic stats logging
         reactor.callLater(60, self.log_stats)
         
+        # Apply queued shares to the stats in batches on the reactor
+        self.stats_drain = task.LoopingCall(self.stats.drain_pending, 1000)
+        self.stats_drain.start(0.1, now=False)
+        
+        # Sample the pool hashrate every minute, with or without the web interface
+        self.hashrate_sampler = task.LoopingCall(self.stats.sample_hashrate)
+        self.hashrate_sampler.start(60, now=False)
+
         # Schedule periodic check for inactive clients
         reactor.callLater(15, self.check_inactive_clients)
     
@@ -449,24 +487,39 @@ class StratumFactory(Factory):
             reactor.callLater(60, self.log_stats)
     
     def periodic_update(self):
-        """Periodically update the block template"""
-        try:
-            self.update_block_template()
-        except Exception as e:
-            logger.error(f"Error in periodic update: {str(e)}")
-            logger.debug(traceback.format_exc())
-        finally:
-            # Schedule the next update
-            reactor.callLater(30, self.periodic_update)
+        """Periodically update the block template, fetching it in a thread so the reactor keeps serving miners"""
+        def log_error(failure):
+            logger.error(f"Error in periodic update: {failure.getErrorMessage()}")
+            logger.debug(failure.getTraceback())
+        
+        def schedule_next(_):
+            reactor.callLater(self.template_interval, self.periodic_update)
+        
+        d = deferToThread(self.bitcoin_rpc.get_block_template, ['coinbasetxn', 'workid'])
+        d.addCallback(self.apply_block_template)
+        d.addErrback(log_error)
+        d.addBoth(schedule_next)
     
     def update_block_template(self):
-        """Update the current block template"""
+        """Update the current block template, blocking until the node answers"""
         try:
             # Get a new block template from Bitcoin Core
             block_template = self.bitcoin_rpc.get_block_template(['coinbasetxn', 'workid'])
-            
+        except Exception as e:
+            logger.error(f"Error updating block template: {str(e)}")
+            logger.debug(traceback.format_exc())
+            return None, None
+        
+        return self.apply_block_template(block_template)
+    
+    def apply_block_template(self, block_template):
+        """Create a job from a block template, store it and send it to all clients"""
+        try:
             # Create mining job
             job = self.create_mining_job(block_template)
+            if not job:
+                # Keep serving the previous job rather than pointing at a missing one
+                return None, None
             
             # Generate job ID
             job_id = f"{int(time.time())}_{self.job_counter}"
@@ -475,12 +528,19 @@ class StratumFactory(Factory):
             # Store job for validation
             self.jobs[job_id] = job
             self.current_jobs[job_id] = job
+            self.latest_job_id = job_id
             
-            # Keep only the last 10 jobs
-            if len(self.jobs) > 10:
-                oldest_job = min(self.jobs.keys())
-                del self.jobs[oldest_job]
+            # The coinbase before the extranonce is the same for every share of
+            # the job, so hash it once and let each share resume from there
+            self._coinbase_midstates[job_id] = _sha256(job['coinbase'][:job['extranonce_pos']])
             
+            # Keep only the last 10 jobs; jobs are stored in creation order, so
+            # the oldest is popped from the front (min() on the ids sorts "_10" before "_9")
+            if len(self.jobs) > 10:
+                oldest_job, _ = self.jobs.popitem(last=False)
+                self.current_jobs.pop(oldest_job, None)
+                self._coinbase_midstates.pop(oldest_job, None)
+
             # Log new block template
             logger.info(f"New block template received at height {job['height']}")
             
@@ -504,7 +564,7 @@ class StratumFactory(Factory):
             transactions = block_template.get('transactions', [])
             
             # Create coinbase transaction
-            coinbase_tx, coinbase_tx_hash = self.create_coinbase_tx(height, block_template['coinbasevalue'])
+            coinbase_tx, coinbase_tx_hash, extranonce_pos = self.create_coinbase_tx(height, block_template['coinbasevalue'])
             
             # Calculate merkle root
             merkle_branches = []
@@ -513,7 +573,7 @@ class StratumFactory(Factory):
             # Add transaction hashes to merkle tree
             tx_hashes = []
             for tx in transactions:
-                tx_hash = binascii.unhexlify(tx['txid'])[::-1]  # Reverse byte order
+                tx_hash = bytes.fromhex(tx['txid'])[::-1]  # Reverse byte order
                 tx_hashes.append(tx_hash)
             
             # Calculate merkle branches
@@ -528,8 +588,16 @@ class StratumFactory(Factory):
                 'merkle_branches': merkle_branches,
                 'height': height,
                 'bits': bits,
+                'network_target': bits_to_target(bits),
                 'transactions': [tx.get('data', '') for tx in transactions],
-                'merkle_root': binascii.hexlify(merkle_root).decode()
+                'merkle_root': merkle_root.hex(),
+                'extranonce_pos': extranonce_pos,
+                # mining.notify fields, hex encoded once for every client
+                'coinbase1_hex': coinbase_tx[:extranonce_pos].hex(),
+                'coinbase2_hex': coinbase_tx[extranonce_pos+8:].hex(),
+                'merkle_branches_hex': [branch.hex() for branch in merkle_branches],
+                'version_hex': f"{version:08x}",
+                'bits_hex': f"{bits:08x}"
             }
             
             return job
@@ -553,11 +621,10 @@ class StratumFactory(Factory):
                     
                     # Also update the pool stats directly to ensure the dashboard shows the correct value
                     if hasattr(self, 'stats'):
-                        for worker_name, worker_stats in self.stats.clients.items():
-                            if 'client_ids' in worker_stats and client_id in worker_stats['client_ids']:
-                                with self.stats.lock:
-                                    self.stats.clients[worker_name]['difficulty'] = new_difficulty
-                                    logger.debug(f"Updated difficulty for worker {worker_name} to {new_difficulty} in pool stats")
+                        for worker_name, worker_stats in list(self.stats.clients.items()):
+                            if client_id in worker_stats.client_ids:
+                                self.stats.set_worker_difficulty(worker_name, new_difficulty)
+                                logger.debug(f"Updated difficulty for worker {worker_name} to {new_difficulty} in pool stats")
         except Exception as e:
             logger.error(f"Error checking inactive clients: {str(e)}")
         finally:
@@ -565,58 +632,43 @@ class StratumFactory(Factory):
             reactor.callLater(15, self.check_inactive_clients)
     
     def create_coinbase_tx(self, height, coinbase_value):
-        """Create a coinbase transaction with extranonce placeholder"""
+        """Create a coinbase transaction with extranonce placeholder, returning (tx, hash, placeholder offset)"""
         # Create a simple coinbase transaction
         # This is a simplified version, a real implementation would create a proper scriptPubKey
         
-        # Version
-        tx = struct.pack('<I', 1)
-        
-        # Input count
-        tx += struct.pack('<B', 1)
-        
-        # Previous output hash (zeros for coinbase)
-        tx += b'\x00' * 32
-        
-        # Previous output index (0xFFFFFFFF for coinbase)
-        tx += struct.pack('<I', 0xFFFFFFFF)
-        
         # Script length (variable)
-        height_script = struct.pack('<I', height) + self.coinbase_message
+        height_script = _UINT32.pack(height) + self.coinbase_message
         script_len = len(height_script) + 8  # Add 8 bytes for extranonce
-        tx += struct.pack('<B', script_len)
-        
-        # Coinbase script with height and extranonce placeholder
-        tx += height_script
-        
-        # Extranonce placeholder (8 bytes)
-        tx += b'\x00\x00\x00\x00\x00\x00\x00\x00'
-        
-        # Sequence
-        tx += struct.pack('<I', 0xFFFFFFFF)
-        
-        # Output count
-        tx += struct.pack('<B', 1)
         
-        # Output value
-        tx += struct.pack('<Q', coinbase_value)
-        
-        # Output script length
         # P2PKH script for the pool address
         # This is a simplified version, a real implementation would create a proper scriptPubKey
         script = b'\x76\xa9\x14' + b'\x00' * 20 + b'\x88\xac'  # OP_DUP OP_HASH160 <20-byte-hash> OP_EQUALVERIFY OP_CHECKSIG
-        tx += struct.pack('<B', len(script))
-        
-        # Output script
-        tx += script
         
-        # Locktime
-        tx += struct.pack('<I', 0)
+        # Collect the fields and join them once at the end
+        tx_parts = [
+            _UINT32.pack(1),           # Version
+            _UINT8.pack(1),            # Input count
+            b'\x00' * 32,              # Previous output hash (zeros for coinbase)
+            _UINT32.pack(0xFFFFFFFF),  # Previous output index (0xFFFFFFFF for coinbase)
+            _UINT8.pack(script_len),   # Script length
+            height_script              # Coinbase script with height, extranonce follows
+        ]
+        extranonce_pos = sum(map(len, tx_parts))
+        tx_parts += [
+            b'\x00\x00\x00\x00\x00\x00\x00\x00',  # Extranonce placeholder (8 bytes)
+            _UINT32.pack(0xFFFFFFFF),  # Sequence
+            _UINT8.pack(1),            # Output count
+            _UINT64.pack(coinbase_value),  # Output value
+            _UINT8.pack(len(script)),  # Output script length
+            script,                    # Output script
+            _UINT32.pack(0)            # Locktime
+        ]
+        tx = b''.join(tx_parts)
         
         # Calculate the hash of the coinbase transaction
-        coinbase_hash = hashlib.sha256(hashlib.sha256(tx).digest()).digest()
+        coinbase_hash = double_sha256(tx)
         
-        return tx, coinbase_hash
+        return tx, coinbase_hash, extranonce_pos
     
     def calculate_merkle_branches(self, coinbase_hash, tx_hashes):
         """Calculate merkle branches for the coinbase transaction"""
@@ -643,16 +695,9 @@ class StratumFactory(Factory):
             if len(merkle_tree) > 2:  # Only add branches if not at the root level
                 branches.append(merkle_tree[1])  # Add the second element as a branch
             
-            # Calculate the next level
-            next_level = []
-            for i in range(0, len(merkle_tree), 2):
-                # Concatenate and hash
-                concat = merkle_tree[i] + merkle_tree[i+1]
-                next_hash = hashlib.sha256(hashlib.sha256(concat).digest()).digest()
-                next_level.append(next_hash)
-            
-            # Update the tree
-            merkle_tree = next_level
+            # Calculate the next level by hashing each concatenated pair
+            merkle_tree = [double_sha256(left + right)
+                           for left, right in zip(merkle_tree[0::2], merkle_tree[1::2])]
         
         # Return branches and root
         return branches, merkle_tree[0]
@@ -660,28 +705,48 @@ class StratumFactory(Factory):
     def send_job_to_all_clients(self, job_id, job, clean_jobs=False):
         """Send the current job to all connected clients"""
         disconnected_clients = set()
-        for client in self.clients.values():
-            if client.authorized:
-                try:
-                    client.send_job(
-                        job_id,
-                        job['prev_block_hash'],
-                        binascii.hexlify(job['coinbase'][:42]).decode(),
-                        binascii.hexlify(job['coinbase'][42+8:]).decode(),
-                        [binascii.hexlify(branch).decode() for branch in job['merkle_branches']],
-                        f"{job['version']:08x}",
-                        f"{job['bits']:08x}",
-                        f"{int(time.time()):08x}",
-                        clean_jobs
-                    )
-                except Exception as e:
-                    logger.error(f"Error sending job to client {client.client_id}: {str(e)}")
-                    logger.debug(traceback.format_exc())
-                    disconnected_clients.add(client)
+        
+        # Every client gets the same notification, so serialize it once
+        params = [
+            job_id,
+            job['prev_block_hash'],
+            job['coinbase1_hex'],
+            job['coinbase2_hex'],
+            job['merkle_branches_hex'],
+            job['version_hex'],
+            job['bits_hex'],
+            f"{int(time.time()):08x}",
+            clean_jobs
+        ]
+        payload = self._encode_notification("mining.notify", params)
+        
+        sent = 0
+        for client in self.authorized_clients:
+            try:
+                client.transport.write(payload)
+                sent += 1
+            except Exception as e:
+                logger.error(f"Error sending job to client {client.client_id}: {str(e)}")
+                logger.debug(traceback.format_exc())
+                disconnected_clients.add(client)
         
         # Remove disconnected clients
         for client in disconnected_clients:
             self.remove_client(client)
+        
+        # Record the broadcast once rather than once per client
+        if sent:
+            self.stats.record_pool_to_miner_method("mining.notify", params)
+            logger.debug(f"Sent job {job_id} to {sent} clients")
+    
+    def _encode_notification(self, method, params):
+        """Serialize a JSON-RPC notification to bytes that can be written to any client"""
+        notification = {
+            "id": None,
+            "method": method,
+            "params": params
+        }
+        return dumps_json_line(notification)
     
     def send_job_to_client(self, client):
         """Send the current job to a client"""
@@ -692,37 +757,24 @@ class StratumFactory(Factory):
                 job_id, job = self.update_block_template()
             else:
                 # Use the most recent job
-                job_id = max(self.jobs.keys())
+                job_id = self.latest_job_id
                 job = self.jobs[job_id]
             
             if job:
-                # Split coinbase transaction
-                coinbase_tx = job['coinbase']
-                pos = coinbase_tx.find(b'\x00\x00\x00\x00\x00\x00\x00\x00')
+                # Send job to client, using the hex fields encoded when the job was created
+                client.send_job(
+                    job_id,
+                    job['prev_block_hash'],
+                    job['coinbase1_hex'],
+                    job['coinbase2_hex'],
+                    job['merkle_branches_hex'],
+                    job['version_hex'],
+                    job['bits_hex'],
+                    f"{int(time.time()):08x}",
+                    True
+                )
                 
-                if pos != -1:
-                    coinbase1 = binascii.hexlify(coinbase_tx[:pos]).decode()
-                    coinbase2 = binascii.hexlify(coinbase_tx[pos+8:]).decode()
-                    
-                    # Convert merkle branches to hex
-                    merkle_branches_hex = [binascii.hexlify(branch).decode() for branch in job['merkle_branches']]
-                    
-                    # Send job to client
-                    client.send_job(
-                        job_id,
-                        job['prev_block_hash'],
-                        coinbase1,
-                        coinbase2,
-                        merkle_branches_hex,
-                        f"{job['version']:08x}",
-                        f"{job['bits']:08x}",
-                        f"{int(time.time()):08x}",
-                        True
-                    )
-                    
-                    logger.debug(f"Sent job {job_id} to client {client.client_id}")
-                else:
-                    logger.error("Extranonce placeholder not found in coinbase")
+                logger.debug(f"Sent job {job_id} to client {client.client_id}")
         except Exception as e:
             logger.error(f"Error sending job to client: {str(e)}")
             logger.debug(traceback.format_exc())
@@ -735,72 +787,83 @@ class StratumFactory(Factory):
             logger.warning(f"Job not found: {job_id}")
             return {'valid': False, 'error': f'Job not found: {job_id}'}
         
-        logger.debug(f"Processing submission for job {job_id} with difficulty {difficulty}")
-        logger.debug(f"Job details: height={job.get('height')}, bits={job.get('bits')}")
+        # Skip building the debug messages below unless they will be logged
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f"Processing submission for job {job_id} with difficulty {difficulty}")
+            logger.debug(f"Job details: height={job.get('height')}, bits={job.get('bits')}")
         
         try:
             # Construct the coinbase transaction
             coinbase_tx = job['coinbase']
             
             # Insert the extranonce values
-            extranonce1_bin = binascii.unhexlify(extranonce1)
-            extranonce2_bin = binascii.unhexlify(extranonce2)
+            extranonce1_bin = bytes.fromhex(extranonce1)
+            extranonce2_bin = bytes.fromhex(extranonce2)
             
             # Log the extranonce values for debugging
-            logger.debug(f"Extranonce1: {extranonce1} (len={len(extranonce1_bin)})")
-            logger.debug(f"Extranonce2: {extranonce2} (len={len(extranonce2_bin)})")
-            
-            # Find the position to insert the extranonce
-            pos = coinbase_tx.find(b'\x00\x00\x00\x00\x00\x00\x00\x00')
-            if pos == -1:
-                logger.error("Extranonce placeholder not found in coinbase")
-                return {'valid': False, 'error': 'Extranonce placeholder not found in coinbase'}
-            
-            # Insert the extranonce values
-            coinbase_tx_with_extranonce = coinbase_tx[:pos] + extranonce1_bin + extranonce2_bin + coinbase_tx[pos+8:]
+            if debug:
+                logger.debug(f"Extranonce1: {extranonce1} (len={len(extranonce1_bin)})")
+                logger.debug(f"Extranonce2: {extranonce2} (len={len(extranonce2_bin)})")
+            
+            # Position to insert the extranonce, recorded when the coinbase was
+            # built, and the precomputed hash state of the coinbase before it
+            pos = job['extranonce_pos']
+            prefix_hash = self._coinbase_midstates.get(job_id)
+            
+            # Hash the coinbase with the extranonce values in place by feeding
+            # the pieces to the hash; the joined coinbase is only built for a block
+            coinbase_tail = memoryview(coinbase_tx)[pos+8:]
+            if prefix_hash is not None:
+                inner = prefix_hash.copy()
+            else:
+                inner = _sha256(coinbase_tx[:pos])
+            inner.update(extranonce1_bin)
+            inner.update(extranonce2_bin)
+            inner.update(coinbase_tail)
             
             # Calculate the merkle root with the updated coinbase
-            coinbase_hash = hashlib.sha256(hashlib.sha256(coinbase_tx_with_extranonce).digest()).digest()
+            coinbase_hash = _sha256(inner.digest()).digest()
             merkle_root = coinbase_hash
             for branch in job['merkle_branches']:
-                branch_bin = binascii.unhexlify(branch)
-                merkle_root = hashlib.sha256(hashlib.sha256(merkle_root + branch_bin).digest()).digest()
+                merkle_root = double_sha256(merkle_root + branch)
             
             # Convert time and nonce to binary
-            time_bin = binascii.unhexlify(time_hex)
-            nonce_bin = binascii.unhexlify(nonce_hex)
+            time_bin = bytes.fromhex(time_hex)
+            nonce_bin = bytes.fromhex(nonce_hex)
             
             # Construct the block header
-            version = struct.pack('<I', job['version'])
-            prev_hash = binascii.unhexlify(job['prev_block_hash'])
-            bits = struct.pack('<I', job['bits'])
+            version = _UINT32.pack(job['version'])
+            prev_hash = bytes.fromhex(job['prev_block_hash'])
+            bits = _UINT32.pack(job['bits'])
             
             # Log the header components for debugging
-            logger.debug(f"Header components:")
-            logger.debug(f"  Version: {binascii.hexlify(version).decode()}")
-            logger.debug(f"  Prev hash: {binascii.hexlify(prev_hash).decode()}")
-            logger.debug(f"  Merkle root: {binascii.hexlify(merkle_root).decode()}")
-            logger.debug(f"  Time: {time_hex}")
-            logger.debug(f"  Bits: {binascii.hexlify(bits).decode()}")
-            logger.debug(f"  Nonce: {nonce_hex}")
+            if debug:
+                logger.debug(f"Header components:")
+                logger.debug(f"  Version: {version.hex()}")
+                logger.debug(f"  Prev hash: {prev_hash.hex()}")
+                logger.debug(f"  Merkle root: {merkle_root.hex()}")
+                logger.debug(f"  Time: {time_hex}")
+                logger.debug(f"  Bits: {bits.hex()}")
+                logger.debug(f"  Nonce: {nonce_hex}")
             
             # Assemble the header
             header = version + prev_hash + merkle_root + time_bin + bits + nonce_bin
             
             # Calculate the hash of the header
             hash_result = hash_block_header(header)
-            hash_hex = binascii.hexlify(hash_result).decode()
+            hash_hex = hash_result.hex()
             hash_int = int.from_bytes(hash_result, byteorder='little')
             
             # Calculate targets
-            diff1_target = 0x00000000FFFF0000000000000000000000000000000000000000000000000000
-            share_target = int(diff1_target / difficulty)
-            network_target = bits_to_target(job['bits'])
+            share_target = difficulty_to_target(difficulty)
+            network_target = job['network_target']
             
             # Log the targets and hash for debugging
-            logger.debug(f"Share target: {share_target:064x}")
-            logger.debug(f"Network target: {network_target:064x}")
-            logger.debug(f"Hash: {hash_hex} (int: {hash_int})")
+            if debug:
+                logger.debug(f"Share target: {share_target:064x}")
+                logger.debug(f"Network target: {network_target:064x}")
+                logger.debug(f"Hash: {hash_hex} (int: {hash_int})")
             
             # Check if the hash meets the share target
             valid_share = hash_int <= share_target
@@ -812,17 +875,20 @@ class StratumFactory(Factory):
                 if valid_block:
                     logger.info(f"BLOCK FOUND! Hash: {hash_hex}")
                     
-                    # Construct the full block
-                    block = header + encode_varint(len(job['transactions']) + 1)
-                    block += coinbase_tx_with_extranonce
-                    
-                    for tx_data in job['transactions']:
-                        block += binascii.unhexlify(tx_data)
+                    # Construct the full block as hex, joining the parts once; the
+                    # template's transactions are already hex, so they are used as is
+                    block_hex = ''.join([
+                        header.hex(),
+                        encode_varint(len(job['transactions']) + 1).hex(),
+                        coinbase_tx[:pos].hex(),
+                        extranonce1_bin.hex(),
+                        extranonce2_bin.hex(),
+                        coinbase_tail.hex()
+                    ] + job['transactions'])
                     
                     # Submit the block to the Bitcoin network
-                    block_hex = binascii.hexlify(block).decode()
                     try:
-                        result = self.bitcoin_rpc.submitblock(block_hex)
+                        result = self.bitcoin_rpc.submit_block(block_hex)
                         if result is None or result == '':
                             logger.info("Block accepted by the network!")
                             return {
@@ -862,18 +928,31 @@ class StratumFactory(Factory):
     def get_new_extranonce1(self):
         """Generate a new extranonce1 value"""
         self.extranonce1_counter += 1
-        return binascii.hexlify(struct.pack('<I', self.extranonce1_counter)).decode()
+        return _UINT32.pack(self.extranonce1_counter).hex()
+    
+    def get_new_subscription_id(self):
+        """Generate a subscription ID that is unique within this pool"""
+        self.subscription_counter += 1
+        return f"{self.subscription_counter:016x}"
     
     def add_client(self, client, miner_agent="Unknown"):
         """Add a client to the factory"""
         self.clients[client.client_id] = client
+        if client.authorized:
+            self.authorized_clients.add(client)
         logger.info(f"Client added: {client.client_id}, total clients: {len(self.clients)}")
         
         # Add client to statistics
         self.stats.add_client(client.client_id, client.worker_name, miner_agent)
     
+    def authorize_client(self, client):
+        """Start sending job broadcasts to a client once it is both subscribed and authorized"""
+        if self.clients.get(client.client_id) is client:
+            self.authorized_clients.add(client)
+    
     def remove_client(self, client):
         """Remove a client from the factory"""
+        self.authorized_clients.discard(client)
         if client.client_id in self.clients:
             del self.clients[client.client_id]
             logger.info(f"Client removed: {client.client_id}, total clients: {len(self.clients)}")
@@ -882,26 +961,32 @@ class StratumFactory(Factory):
             if client.worker_name:
                 self.stats.remove_client(client.worker_name)
 
-def hash_block_header(header):
-    """Hash a block header"""
-    return hashlib.sha256(hashlib.sha256(header).digest()).digest()
+def loads_json(line):
+    """Parse one JSON-RPC message from the raw bytes of a line"""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line.decode('utf-8'))
+
+def dumps_json_line(obj):
+    """Serialize a JSON-RPC message to newline-terminated bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj) + b'\n'
+    return (json.dumps(obj) + '\n').encode()
 
-def bits_to_target(bits):
-    """Convert bits to target"""
-    bits_int = int.from_bytes(bits, byteorder='little')
-    exponent = bits_int >> 24
-    mantissa = bits_int & 0xFFFFFF
-    return mantissa * (2 ** (8 * (exponent - 3)))
+@functools.lru_cache(maxsize=1024)
+def difficulty_to_target(difficulty):
+    """Convert a share difficulty to the target a share hash must not exceed"""
+    return int(DIFF1_TARGET / difficulty)
 
 def encode_varint(n):
     """Encode a variable-length integer"""
     if n < 0:
         raise ValueError("Negative numbers are not supported")
     elif n < 0xFD:
-        return struct.pack('<B', n)
+        return _UINT8.pack(n)
     elif n < 0xFFFF:
-        return struct.pack('<B', 0xFD) + struct.pack('<H', n)
+        return b'\xfd' + _UINT16.pack(n)
     elif n < 0xFFFFFFFF:
-        return struct.pack('<B', 0xFE) + struct.pack('<I', n)
+        return b'\xfe' + _UINT32.pack(n)
     else:
-        return struct.pack('<B', 0xFF) + struct.pack('<Q', n)
+        return b'\xff' + _UINT64.pack(n)
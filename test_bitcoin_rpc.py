@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import configparser
+import unittest
+from unittest import mock
+
+import bitcoin_rpc
+from bitcoin_rpc import BitcoinRPC, _CircuitBreaker
+
+def make_config():
+    """Build the [bitcoind] section BitcoinRPC reads"""
+    config = configparser.ConfigParser()
+    config['bitcoind'] = {
+        'rpchost': '127.0.0.1',
+        'rpcport': '8332',
+        'rpcuser': 'user',
+        'rpcpassword': 'pass'
+    }
+    return config
+
+class FlakyBatchProxy:
+    """Stub proxy whose batch_ consumes its input like AuthServiceProxy and fails once"""
+    
+    def __init__(self):
+        self.failures_left = 1
+        self.sent = []
+    
+    def getblockchaininfo(self):
+        return {'chain': 'regtest', 'blocks': 0}
+    
+    def batch_(self, rpc_calls):
+        # AuthServiceProxy.batch_ pops the method name off each call list
+        calls = [(rpc_call.pop(0), rpc_call) for rpc_call in rpc_calls]
+        self.sent.append(calls)
+        if self.failures_left:
+            self.failures_left -= 1
+            raise ConnectionRefusedError("connection refused")
+        return [method for method, _ in calls]
+
+class DownProxy:
+    """Stub proxy for a node that answers the connection check, then goes away"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def getblockchaininfo(self):
+        return {'chain': 'regtest', 'blocks': 0}
+    
+    def batch_(self, rpc_calls):
+        self.calls += 1
+        raise ConnectionRefusedError("connection refused")
+
+class BatchRetryTest(unittest.TestCase):
+    def test_retry_resends_method_names(self):
+        proxy = FlakyBatchProxy()
+        with mock.patch.object(BitcoinRPC, '_new_proxy', return_value=proxy):
+            rpc = BitcoinRPC(config=make_config(), retry_delay=0, pool_size=1)
+            results = rpc.batch([
+                ('getblockchaininfo', []),
+                ('validateaddress', ['bcrt1qexample'])
+            ])
+        
+        self.assertEqual(results, ['getblockchaininfo', 'validateaddress'])
+        self.assertEqual(len(proxy.sent), 2)
+        self.assertEqual(proxy.sent[0], proxy.sent[1])
+        self.assertEqual(proxy.sent[1], [('getblockchaininfo', []),
+                                         ('validateaddress', ['bcrt1qexample'])])
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(bitcoin_rpc.time, 'monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = _CircuitBreaker(failure_threshold=3, cooldown=5, max_cooldown=12)
+    
+    def open_breaker(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+    
+    def test_opens_after_threshold_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue(self.breaker.allow())
+        
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+    
+    def test_success_resets_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'closed')
+    
+    def test_one_probe_after_cooldown(self):
+        self.open_breaker()
+        self.now += 4.9
+        self.assertFalse(self.breaker.allow())
+        
+        self.now += 0.1
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, 'half_open')
+        # Only the one probe goes through until it reports back
+        self.assertFalse(self.breaker.allow())
+    
+    def test_probe_success_closes(self):
+        self.open_breaker()
+        self.now += 5
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self.breaker.cooldown, 5)
+        self.assertTrue(self.breaker.allow())
+    
+    def test_probe_failure_doubles_cooldown_up_to_max(self):
+        self.open_breaker()
+        for cooldown in (10, 12, 12):
+            self.now += self.breaker.cooldown
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+            self.assertEqual(self.breaker.state, 'open')
+            self.assertEqual(self.breaker.cooldown, cooldown)
+        
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.cooldown, 5)
+    
+    def test_open_breaker_fails_fast(self):
+        proxy = DownProxy()
+        with mock.patch.object(BitcoinRPC, '_new_proxy', return_value=proxy):
+            rpc = BitcoinRPC(config=make_config(), retry_delay=0, pool_size=1)
+            rpc._breaker = self.breaker
+            with self.assertRaises(ConnectionRefusedError):
+                rpc.batch([('getblockchaininfo', [])])
+            self.assertEqual(proxy.calls, 3)
+            
+            with self.assertRaises(ConnectionError) as raised:
+                rpc.batch([('getblockchaininfo', [])])
+            self.assertIn('circuit breaker', str(raised.exception))
+            self.assertEqual(proxy.calls, 3)
+
+if __name__ == '__main__':
+    unittest.main()
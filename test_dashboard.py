@@ -32,6 +32,7 @@ class MockFactory:
                 'transactions': ['tx1', 'tx2', 'tx3']
             }
         }
+        self.latest_job_id = '1'
         
         # Set the pool address (this would normally come from config.ini)
         self.pool_address = "1EXAMPLE000000000000000000000000XXX"
@@ -52,7 +53,7 @@ class MockFactory:
         self.stats.add_client('192.168.1.100', 'miner1_abcd')
         
         # Set a non-default difficulty for the test client
-        self.stats.clients['miner1_abcd']['difficulty'] = 2.5
+        self.stats.set_worker_difficulty('miner1_abcd', 2.5)
         
         # Add some shares
         self.stats.add_share('miner1_abcd', valid=True, difficulty=2.5)
@@ -74,8 +75,7 @@ class MockFactory:
             
             # Update the difficulty
             difficulty = difficulties[index]
-            if 'miner1_abcd' in self.stats.clients:
-                self.stats.clients['miner1_abcd']['difficulty'] = difficulty
+            if self.stats.set_worker_difficulty('miner1_abcd', difficulty):
                 print(f"Updated test miner difficulty to {difficulty}")
             
             # Move to the next difficulty in the cycle
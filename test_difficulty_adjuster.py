@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from difficulty_adjuster import DifficultyAdjuster
+
+class RecordShareTest(unittest.TestCase):
+    def setUp(self):
+        # Shares every 7 to 13 seconds leave the difficulty alone
+        self.adjuster = DifficultyAdjuster(initial_difficulty=8, target_share_time=10)
+        self.now = 1000.0
+    
+    def share(self, interval):
+        self.now += interval
+        return self.adjuster.record_share('client', self.now)
+    
+    def test_first_share_only_records_time(self):
+        self.assertEqual(self.share(0), (False, 8))
+    
+    def test_fast_shares_raise_difficulty(self):
+        self.share(0)
+        self.assertEqual(self.share(2), (True, 16))
+    
+    def test_slow_shares_lower_difficulty(self):
+        self.share(0)
+        self.assertEqual(self.share(20), (True, 4))
+    
+    def test_one_fast_share_is_smoothed_out(self):
+        self.share(0)
+        for _ in range(5):
+            self.assertEqual(self.share(10), (False, 8))
+        # A single quick share only pulls the average down to 8.6 seconds
+        self.assertEqual(self.share(3), (False, 8))
+        self.assertEqual(self.share(10), (False, 8))
+    
+    def test_one_slow_share_is_smoothed_out(self):
+        self.share(0)
+        for _ in range(5):
+            self.share(10)
+        self.assertEqual(self.share(20), (False, 8))
+    
+    def test_average_follows_the_new_difficulty(self):
+        self.share(0)
+        self.assertEqual(self.share(4), (True, 16))
+        # The 4 second average now stands for 8 seconds at difficulty 16
+        self.assertAlmostEqual(self.adjuster._stripe('client')[1]['client'].share_interval, 8)
+        self.assertEqual(self.share(8), (False, 16))
+
+if __name__ == '__main__':
+    unittest.main()
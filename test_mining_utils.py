@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import stratum
+import simple_web_interface
+from mining_utils import DIFF1_TARGET, bits_to_target, create_coinbase, double_sha256, get_difficulty
+
+def coinbase_script_sig(coinbase_hex):
+    """The scriptSig of a coinbase built by create_coinbase"""
+    coinbase = bytes.fromhex(coinbase_hex)
+    # Version (4), input count (1), previous output hash (32) and index (4)
+    script_len = coinbase[41]
+    return coinbase[42:42 + script_len]
+
+class CoinbaseHeightTest(unittest.TestCase):
+    def height_push(self, height):
+        """The scriptSig bytes before the coinbase message"""
+        message = b'/joule-pool/'
+        script_sig = coinbase_script_sig(create_coinbase(height, 625000000, message, 'address'))
+        self.assertTrue(script_sig.endswith(bytes([len(message)]) + message))
+        return script_sig[:-len(message) - 1].hex()
+    
+    def test_small_heights_use_op_n(self):
+        for height in range(1, 17):
+            with self.subTest(height=height):
+                self.assertEqual(self.height_push(height), f"{0x50 + height:02x}")
+    
+    def test_sign_bit_boundaries(self):
+        # Expected bytes are what CScript() << height gives in Bitcoin Core
+        self.assertEqual(self.height_push(17), "0111")
+        self.assertEqual(self.height_push(127), "017f")
+        self.assertEqual(self.height_push(128), "028000")
+        self.assertEqual(self.height_push(255), "02ff00")
+        self.assertEqual(self.height_push(256), "020001")
+        self.assertEqual(self.height_push(32767), "02ff7f")
+        self.assertEqual(self.height_push(32768), "03008000")
+    
+    def test_mainnet_heights(self):
+        # First block with a BIP34 height, and block 800000
+        self.assertEqual(self.height_push(227931), "035b7a03")
+        self.assertEqual(self.height_push(800000), "0300350c")
+
+class DoubleSha256Test(unittest.TestCase):
+    def test_known_digests(self):
+        self.assertEqual(double_sha256(b'').hex(),
+                         "5df6e0e2761359d30a8275058e299fcc0381534545f55cf43e41983f5d4c9456")
+        self.assertEqual(double_sha256(b'hello').hex(),
+                         "9595c9df90075148eb06860365df33584b75bff782a510c6cd4883a419833d50")
+    
+    def test_stratum_uses_the_same_helper(self):
+        self.assertIs(stratum.double_sha256, double_sha256)
+
+class TargetTest(unittest.TestCase):
+    def test_bits_to_target(self):
+        self.assertEqual(bits_to_target(0x1d00ffff), DIFF1_TARGET)
+        self.assertEqual(bits_to_target(0x1b0404cb), 0x0404cb << (8 * 24))
+        self.assertEqual(bits_to_target(0x207fffff), 0x7fffff << (8 * 29))
+        self.assertEqual(bits_to_target(0x03123456), 0x123456)
+        self.assertEqual(bits_to_target(0x02008000), 0x80)
+        self.assertEqual(bits_to_target(0x01003456), 0)
+    
+    def test_difficulty(self):
+        self.assertEqual(get_difficulty(0x1d00ffff), 1)
+        self.assertAlmostEqual(get_difficulty(0x1b0404cb), 16307.420938523983)
+        self.assertEqual(simple_web_interface.bits_to_difficulty(0x1b0404cb), "16307.42")
+    
+    def test_one_definition(self):
+        self.assertIs(stratum.bits_to_target, bits_to_target)
+        self.assertEqual(stratum.DIFF1_TARGET, DIFF1_TARGET)
+        self.assertEqual(DIFF1_TARGET, 0x00000000FFFF0000000000000000000000000000000000000000000000000000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+
+from pool_stats import PoolStats, HASHRATE_WINDOW
+
+def naive_window_difficulty(shares, current_time, window_seconds):
+    """Sum the difficulty of the shares within window_seconds of current_time"""
+    cutoff = current_time - min(window_seconds, HASHRATE_WINDOW)
+    return sum(difficulty for share_time, difficulty in shares if share_time >= cutoff)
+
+class WindowDifficultyTest(unittest.TestCase):
+    def setUp(self):
+        self.stats = PoolStats()
+        self.shares = []
+    
+    def add_share(self, share_time, difficulty):
+        self.stats._apply_share('worker', True, False, difficulty, share_time)
+        self.shares.append((share_time, difficulty))
+    
+    def test_sums_shares_in_window(self):
+        for share_time, difficulty in [(100, 1), (200, 2), (250, 4), (390, 8)]:
+            self.add_share(share_time, difficulty)
+        
+        self.assertEqual(self.stats._window_difficulty(400, 300), 15)
+        self.assertEqual(self.stats._window_difficulty(400, 150), 12)
+        self.assertEqual(self.stats._window_difficulty(400, 60), 8)
+        # Windows longer than HASHRATE_WINDOW only see its shares
+        self.assertEqual(self.stats._window_difficulty(400, 600), 15)
+    
+    def test_share_on_cutoff_is_kept(self):
+        self.add_share(100, 3)
+        self.add_share(150, 5)
+        self.assertEqual(self.stats._window_difficulty(100 + HASHRATE_WINDOW, HASHRATE_WINDOW), 8)
+        self.assertEqual(self.stats._window_difficulty(100.5 + HASHRATE_WINDOW, HASHRATE_WINDOW), 5)
+    
+    def test_expired_shares_are_dropped(self):
+        for share_time in range(0, 100):
+            self.add_share(share_time, 1)
+        self.add_share(500, 2)
+        
+        self.assertEqual(self.stats._window_difficulty(500, 60), 2)
+        # Most of the window expired, so the dead prefix was compacted away
+        self.assertEqual(len(self.stats.share_times), 1)
+        self.assertEqual(self.stats._window_start, 0)
+        
+        self.add_share(510, 4)
+        self.assertEqual(self.stats._window_difficulty(520, 300), 6)
+    
+    def test_all_expired_resets_totals(self):
+        self.add_share(100, 1.5)
+        self.add_share(110, 2.5)
+        self.assertEqual(self.stats._window_difficulty(1000, 300), 0)
+        self.assertEqual(len(self.stats.share_times), 0)
+        self.assertEqual(self.stats._difficulty_total, 0)
+        
+        self.add_share(1010, 7)
+        self.assertEqual(self.stats._window_difficulty(1020, 300), 7)
+    
+    def test_matches_naive_sum(self):
+        rng = random.Random(1234)
+        share_time = 0.0
+        for _ in range(2000):
+            share_time += rng.expovariate(1 / 3)
+            self.add_share(share_time, rng.choice([1, 2, 4, 8, 16, 32]))
+            if rng.random() < 0.1:
+                now = share_time + rng.uniform(0, 400)
+                for window_seconds in (30, 120, 300, 600):
+                    with self.subTest(now=now, window_seconds=window_seconds):
+                        self.assertEqual(self.stats._window_difficulty(now, window_seconds),
+                                         naive_window_difficulty(self.shares, now, window_seconds))
+                share_time = now
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from twisted.web.test.requesthelper import DummyRequest
+
+from pool_stats import PoolStats
+from simple_web_interface import JSONStatsResource
+
+class MockFactory:
+    """Factory with just what the API reads"""
+    
+    def __init__(self):
+        self.stats = PoolStats()
+        self.jobs = {}
+        self.latest_job_id = None
+
+def get(resource, uri, if_none_match=None):
+    """Render a GET of uri, returning (request, body)"""
+    request = DummyRequest([b''])
+    request.uri = uri
+    if if_none_match is not None:
+        request.requestHeaders.setRawHeaders(b'if-none-match', [if_none_match])
+    # Twisted fills request.args the same way, dropping items without a value
+    request.args = parse_qs(urlsplit(uri).query)
+    return request, resource.render_GET(request)
+
+def etag(request):
+    return request.responseHeaders.getRawHeaders(b'etag')[0]
+
+class JSONStatsResourceTest(unittest.TestCase):
+    def setUp(self):
+        self.factory = MockFactory()
+        self.factory.stats.add_share('worker1', difficulty=2)
+        self.resource = JSONStatsResource(self.factory)
+    
+    def test_bare_pretty_flag_indents(self):
+        compact_request, compact = get(self.resource, b'/api')
+        pretty_request, pretty = get(self.resource, b'/api?pretty')
+        
+        self.assertNotIn(b'\n', compact)
+        self.assertIn(b'\n  "pool": {', pretty)
+        self.assertEqual(json.loads(pretty)['workers'], json.loads(compact)['workers'])
+        self.assertNotEqual(etag(pretty_request), etag(compact_request))
+    
+    def test_bare_all_flag_includes_idle_workers(self):
+        self.factory.stats.add_client('idle1', 'worker2')
+        
+        _, body = get(self.resource, b'/api')
+        self.assertEqual(list(json.loads(body)['workers']), ['worker1'])
+        
+        _, body = get(self.resource, b'/api?all')
+        workers = json.loads(body)['workers']
+        self.assertEqual(sorted(workers), ['worker1', 'worker2'])
+        self.assertEqual(workers['worker2']['valid_shares'], 0)
+    
+    def test_etag_is_stable_between_polls(self):
+        first, body = get(self.resource, b'/api')
+        
+        # Five seconds later the uptime and timestamp have moved on
+        later = time.time() + 5
+        with mock.patch.object(time, 'time', return_value=later):
+            request, body = get(self.resource, b'/api', etag(first))
+        self.assertEqual(request.responseCode, 304)
+        self.assertEqual(body, b'')
+        self.assertEqual(etag(request), etag(first))
+    
+    def test_etag_changes_with_shares_and_jobs(self):
+        first, _ = get(self.resource, b'/api')
+        
+        # Past the response cache's TTL, so each request sees the change
+        now = time.time()
+        self.factory.stats.add_share('worker1', difficulty=2)
+        with mock.patch.object(time, 'time', return_value=now + 2):
+            after_share, body = get(self.resource, b'/api', etag(first))
+        self.assertNotEqual(after_share.responseCode, 304)
+        self.assertNotEqual(etag(after_share), etag(first))
+        self.assertEqual(json.loads(body)['pool']['valid_shares'], 2)
+        
+        self.factory.latest_job_id = 'job2'
+        with mock.patch.object(time, 'time', return_value=now + 4):
+            after_job, _ = get(self.resource, b'/api', etag(after_share))
+        self.assertNotEqual(after_job.responseCode, 304)
+        self.assertNotEqual(etag(after_job), etag(after_share))
+
+if __name__ == '__main__':
+    unittest.main()
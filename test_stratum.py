@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from twisted.internet import reactor, task
+
+from stratum import StratumFactory
+
+def make_template(height):
+    """A minimal getblocktemplate result"""
+    return {
+        'version': 0x20000000,
+        'previousblockhash': '00' * 32,
+        'height': height,
+        'bits': '207fffff',
+        'coinbasevalue': 5000000000,
+        'transactions': []
+    }
+
+class StubRPC:
+    """Stub node that always returns the same block template"""
+    
+    def __init__(self, template):
+        self.template = template
+    
+    def get_block_template(self, rules=None):
+        return self.template
+
+class ApplyBlockTemplateTest(unittest.TestCase):
+    def setUp(self):
+        self.factory = StratumFactory(StubRPC(make_template(100)), 'bcrt1qexample')
+    
+    def tearDown(self):
+        # Nothing runs the reactor here; drop what the factory scheduled
+        self.factory.stats_drain.stop()
+        self.factory.hashrate_sampler.stop()
+        for call in reactor.getDelayedCalls():
+            call.cancel()
+    
+    def test_bad_template_keeps_latest_job(self):
+        latest_job_id = self.factory.latest_job_id
+        self.assertIn(latest_job_id, self.factory.jobs)
+        
+        self.assertEqual(self.factory.apply_block_template({'height': 101}), (None, None))
+        self.assertEqual(self.factory.latest_job_id, latest_job_id)
+        self.assertEqual(list(self.factory.jobs), [latest_job_id])
+        self.assertEqual(list(self.factory.current_jobs), [latest_job_id])
+        self.assertEqual(list(self.factory._coinbase_midstates), [latest_job_id])
+    
+    def test_keeps_last_ten_jobs(self):
+        for height in range(101, 112):
+            job_id, job = self.factory.apply_block_template(make_template(height))
+            self.assertEqual(job['height'], height)
+        
+        self.assertEqual(len(self.factory.jobs), 10)
+        self.assertEqual(self.factory.latest_job_id, job_id)
+        self.assertEqual(next(reversed(self.factory.jobs)), job_id)
+        self.assertEqual(set(self.factory.current_jobs), set(self.factory.jobs))
+        self.assertEqual(set(self.factory._coinbase_midstates), set(self.factory.jobs))
+        self.assertEqual([job['height'] for job in self.factory.jobs.values()], list(range(102, 112)))
+
+class HashrateSamplerTest(unittest.TestCase):
+    def setUp(self):
+        self.factory = StratumFactory(StubRPC(make_template(100)), 'bcrt1qexample')
+    
+    def tearDown(self):
+        self.factory.stats_drain.stop()
+        self.factory.hashrate_sampler.stop()
+        for call in reactor.getDelayedCalls():
+            call.cancel()
+    
+    def test_factory_samples_hashrate(self):
+        sampler = self.factory.hashrate_sampler
+        self.assertTrue(sampler.running)
+        self.assertEqual(sampler.interval, 60)
+        
+        # Run the sampler on a fake clock instead of the reactor
+        sampler.stop()
+        sampler.clock = task.Clock()
+        sampler.start(60, now=False)
+        
+        self.factory.stats.add_share('worker', difficulty=2)
+        sampler.clock.advance(60)
+        self.assertEqual(len(self.factory.stats.hashrate_history), 1)
+        self.assertGreater(self.factory.stats.hashrate_history[0][1], 0)
+        
+        sampler.clock.advance(60)
+        self.assertEqual(len(self.factory.stats.hashrate_history), 2)
+
+if __name__ == '__main__':
+    unittest.main()
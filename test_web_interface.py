@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+from unittest import mock
+
+from twisted.web.test.requesthelper import DummyRequest
+
+import simple_web_interface
+from pool_stats import PoolStats
+from web_interface import JSONStatsResource
+
+class MockFactory:
+    """Factory with just what the legacy API reads"""
+    
+    def __init__(self):
+        self.stats = PoolStats()
+        self.current_block_template = {'height': 100, 'bits': '207fffff'}
+        self.pool_address = 'bcrt1qexample'
+        self.coinbase_message = b'/joule-pool/'
+
+def get(resource, uri):
+    """Render a GET of uri; request.args is left empty as Twisted does for bare flags"""
+    request = DummyRequest([b''])
+    request.uri = uri
+    return resource.render_GET(request)
+
+class LegacyJSONStatsResourceTest(unittest.TestCase):
+    def setUp(self):
+        self.resource = JSONStatsResource(MockFactory())
+    
+    def test_bare_pretty_flag_indents_by_two(self):
+        self.assertNotIn(b'\n', get(self.resource, b'/api'))
+        self.assertIn(b'\n  "pool": {', get(self.resource, b'/api?pretty'))
+    
+    def test_pretty_output_does_not_depend_on_orjson(self):
+        pretty = get(self.resource, b'/api?pretty')
+        with mock.patch.object(simple_web_interface, 'orjson', None):
+            stdlib_pretty = get(self.resource, b'/api?pretty')
+        # The uptime moves between the two renders, so compare the layout
+        self.assertEqual(json.loads(stdlib_pretty).keys(), json.loads(pretty).keys())
+        self.assertIn(b'\n  "pool": {', stdlib_pretty)
+
+if __name__ == '__main__':
+    unittest.main()
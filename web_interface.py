@@ -2,12 +2,17 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
+import time
 from twisted.web import server, resource, static
 from twisted.web.template import Element, renderer, XMLFile, flattenString
 from twisted.internet import reactor, task
 from twisted.python.filepath import FilePath
 
+from simple_web_interface import _dumps_json, _query_args
+
+# Seconds a rendered stats page is served again before the template is re-flattened
+PAGE_CACHE_TTL = 1
+
 class PoolStatsElement(Element):
     """Element for rendering pool statistics"""
     
@@ -79,16 +84,30 @@ class PoolStatsPage(resource.Resource):
     def __init__(self, factory):
         self.factory = factory
         self.element = PoolStatsElement(factory)
+        self._html_cache = b''
+        self._html_cache_time = -PAGE_CACHE_TTL
         resource.Resource.__init__(self)
     
     def render_GET(self, request):
         request.setHeader(b"content-type", b"text/html; charset=utf-8")
         
+        # Serve the last render while it is fresh instead of walking the template again
+        now = time.monotonic()
+        if now - self._html_cache_time < PAGE_CACHE_TTL:
+            return self._html_cache
+        
         d = flattenString(request, self.element)
+        d.addCallback(self._cache_html, now)
         d.addCallback(lambda html: request.write(html))
         d.addCallback(lambda _: request.finish())
         
         return server.NOT_DONE_YET
+    
+    def _cache_html(self, html, rendered_at):
+        """Remember a flattened page so requests within PAGE_CACHE_TTL can reuse it"""
+        self._html_cache = html
+        self._html_cache_time = rendered_at
+        return html
 
 class JSONStatsResource(resource.Resource):
     """Resource for JSON API access to pool statistics"""
@@ -125,7 +144,8 @@ class JSONStatsResource(resource.Resource):
             'coinbase_message': self.factory.coinbase_message.decode()
         }
         
-        return json.dumps(response, indent=4).encode('utf-8')
+        # Compact by default, indented when requested with ?pretty
+        return _dumps_json(response, pretty=b'pretty' in _query_args(request))
 
 def create_templates_directory():
     """Create the templates directory if it doesn't exist"""